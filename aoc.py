@@ -1,10 +1,22 @@
+import bisect
+import gzip
+import heapq
+import importlib
+import inspect
+import io
+import json
 import math
+import mmap
 import pathlib
-from dataclasses import dataclass
+import statistics
+import sys
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 from functools import wraps
-from time import time
-from unittest import case
+from time import perf_counter_ns
 
 
 def chunk_list(lst, n):
@@ -19,6 +31,35 @@ def chunk_pairs(lst):
         yield lst[i:i + 2]
 
 
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    NumPy, plotting and solver backends are only needed on some code paths,
+    this keeps their import time off the paths that never touch them.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+# days that never touch the array helpers below don't pay for numpy
+np = lazy_import('numpy')
+
+
 class TimeUnit(Enum):
     s = 1
     ms = 2
@@ -27,34 +68,177 @@ class TimeUnit(Enum):
     hr = 5
 
 
+def format_time(elapsed_ns: float, unit: TimeUnit = TimeUnit.s) -> str:
+    match unit:
+        case TimeUnit.s:
+            return f'{elapsed_ns / 1e9:.4f} s'
+        case TimeUnit.ms:
+            return f'{elapsed_ns / 1e6:.4f} ms'
+        case TimeUnit.us:
+            return f'{elapsed_ns / 1e3:.4f} us'
+        case TimeUnit.min:
+            return f'{elapsed_ns / 1e9 / 60.:.4f} min'
+        case TimeUnit.hr:
+            return f'{elapsed_ns / 1e9 / 3600.:.4f} hr'
+        case _:
+            raise ValueError
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    repeats: int
+    warmup: int
+    min_ns: int
+    median_ns: float
+    p95_ns: int
+    mean_ns: float
+    stddev_ns: float
+    samples_ns: list[int]
+
+    @classmethod
+    def from_samples(cls, name: str, samples_ns: list[int],
+                     warmup: int = 0) -> 'BenchmarkResult':
+        ordered = sorted(samples_ns)
+        return cls(name=name,
+                   repeats=len(ordered),
+                   warmup=warmup,
+                   min_ns=ordered[0],
+                   median_ns=statistics.median(ordered),
+                   p95_ns=ordered[math.ceil(0.95 * len(ordered)) - 1],
+                   mean_ns=statistics.fmean(ordered),
+                   stddev_ns=(statistics.stdev(ordered)
+                              if len(ordered) > 1 else 0.),
+                   samples_ns=samples_ns)
+
+    def summary(self, unit: TimeUnit = TimeUnit.s) -> str:
+        return (f'min {format_time(self.min_ns, unit)}, '
+                f'median {format_time(self.median_ns, unit)}, '
+                f'p95 {format_time(self.p95_ns, unit)}, '
+                f'stddev {format_time(self.stddev_ns, unit)} '
+                f'({self.repeats} runs)')
+
+    def to_json(self, filepath: pathlib.Path) -> None:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f, indent=2)
+
+
+def _call(f, args, kw):
+    result = f(*args, **kw)
+    if inspect.isgenerator(result):
+        result = list(result)
+    return result
+
+
+def _sample(f, args, kw, repeats: int, warmup: int):
+    for _ in range(warmup):
+        _call(f, args, kw)
+    samples = []
+    result = None
+    for _ in range(repeats):
+        ts = perf_counter_ns()
+        result = _call(f, args, kw)
+        samples.append(perf_counter_ns() - ts)
+    return result, samples
+
+
+async def _async_sample(f, args, kw, repeats: int, warmup: int):
+    for _ in range(warmup):
+        await f(*args, **kw)
+    samples = []
+    result = None
+    for _ in range(repeats):
+        ts = perf_counter_ns()
+        result = await f(*args, **kw)
+        samples.append(perf_counter_ns() - ts)
+    return result, samples
+
+
+def benchmark(f, *args, repeats: int = 10, warmup: int = 1,
+              **kw) -> BenchmarkResult:
+    """Time repeated calls of f(*args, **kw).
+
+    Generators are consumed and coroutine functions are awaited, so the
+    samples cover the actual work rather than creating the generator.
+    """
+    if inspect.iscoroutinefunction(f):
+        # asyncio alone takes longer to import than the rest of aoc
+        import asyncio
+        _, samples = asyncio.run(_async_sample(f, args, kw, repeats, warmup))
+    else:
+        _, samples = _sample(f, args, kw, repeats, warmup)
+    return BenchmarkResult.from_samples(f.__name__, samples, warmup)
+
+
 # Based on https://stackoverflow.com/questions/1622943/timeit-versus-timing-decorator
-def timer(unit: TimeUnit = TimeUnit.s, display_args: bool = False):
+def timer(unit: TimeUnit = TimeUnit.s, display_args: bool = False,
+          repeats: int = 1, warmup: int = 0,
+          json_path: pathlib.Path = None):
+    """Print how long each call takes.
+
+    With repeats > 1 or warmup > 0 the call is benchmarked instead: the
+    statistics are printed, kept on the wrapper as `.benchmark` and
+    written to `json_path` if given. The last call's result is returned,
+    as a generator again for generator functions.
+    """
+    single = repeats == 1 and warmup == 0
+
     def timing(f):
-        @wraps(f)
-        def wrap(*args, **kw):
-            ts = time()
-            result = f(*args, **kw)
-            te = time()
-            time_string = ''
-            match unit:
-                case TimeUnit.s:
-                    time_string = f'{te - ts:.4f} s'
-                case TimeUnit.ms:
-                    time_string = f'{1000*(te - ts):.4f} ms'
-                case TimeUnit.us:
-                    time_string = f'{1000000*(te - ts):.4f} us'
-                case TimeUnit.min:
-                    time_string = f'{(te - ts)/60.:.4f} min'
-                case TimeUnit.hr:
-                    time_string = f'{(te - ts)/3600.:.4f} hr'
-                case _:
-                    raise ValueError
+        def report(args, kw, samples):
+            if single:
+                time_string = format_time(samples[0], unit)
+            else:
+                wrap.benchmark = BenchmarkResult.from_samples(f.__name__,
+                                                              samples,
+                                                              warmup)
+                time_string = wrap.benchmark.summary(unit)
+                if json_path is not None:
+                    wrap.benchmark.to_json(json_path)
             if display_args:
                 print(f'func:{f.__name__} args:{args}{kw} took: {time_string}')
             else:
                 print(f'func:{f.__name__} took: {time_string}')
 
-            return result
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def wrap(*args, **kw):
+                result, samples = await _async_sample(f, args, kw, repeats,
+                                                      warmup)
+                report(args, kw, samples)
+                return result
+        elif inspect.isgeneratorfunction(f) and single:
+            @wraps(f)
+            def wrap(*args, **kw):
+                # only the time spent inside the generator is counted,
+                # not the time the consumer spends between items
+                gen = f(*args, **kw)
+                elapsed = 0
+                while True:
+                    ts = perf_counter_ns()
+                    try:
+                        item = next(gen)
+                    except StopIteration as stop:
+                        elapsed += perf_counter_ns() - ts
+                        report(args, kw, [elapsed])
+                        return stop.value
+                    elapsed += perf_counter_ns() - ts
+                    yield item
+        elif inspect.isgeneratorfunction(f):
+            @wraps(f)
+            def wrap(*args, **kw):
+                # each run is consumed to time it; the last run's items are
+                # handed back as the generator the caller expects
+                items, samples = _sample(f, args, kw, repeats, warmup)
+                report(args, kw, samples)
+                return (item for item in items)
+        else:
+            @wraps(f)
+            def wrap(*args, **kw):
+                result, samples = _sample(f, args, kw, repeats, warmup)
+                report(args, kw, samples)
+                return result
+
+        wrap.benchmark = None
         return wrap
     return timing
 
@@ -99,8 +283,48 @@ class Direction(Enum):
             case _:
                 raise ValueError
 
+    @property
+    def offset(self) -> tuple[int, int]:
+        """(dx, dy) of one step, with y increasing southwards."""
+        match self:
+            case Direction.N:
+                return 0, -1
+            case Direction.E:
+                return 1, 0
+            case Direction.W:
+                return -1, 0
+            case Direction.S:
+                return 0, 1
+            case _:
+                raise ValueError
 
-@dataclass(frozen=True)
+
+# Points can also be packed into a single int, (x << 32 | y) with both
+# coordinates offset to be non-negative. Neighbour keys are then a single
+# integer addition and hashing them allocates nothing.
+PACK_OFFSET = 1 << 31
+PACK_MASK = (1 << 32) - 1
+
+
+def pack_point(x: int, y: int) -> int:
+    return (x + PACK_OFFSET) << 32 | (y + PACK_OFFSET)
+
+
+def unpack_point(key: int) -> tuple[int, int]:
+    return (key >> 32) - PACK_OFFSET, (key & PACK_MASK) - PACK_OFFSET
+
+
+def packed_offsets(directions: type[Enum]) -> tuple[int, ...]:
+    return tuple((d.offset[0] << 32) + d.offset[1] for d in directions)
+
+
+def packed_neighbors(key: int, offsets: tuple[int, ...]) -> list[int]:
+    """Keys of the neighbours of a packed point, e.g. for
+    offsets=packed_offsets(Direction8)."""
+    return [key + offset for offset in offsets]
+
+
+@dataclass(frozen=True, slots=True)
 class Point:
     x: int
     y: int
@@ -137,19 +361,27 @@ class Point:
                 Point(self.x+1, self.y)}
 
     def immediate_neighbors_after(self, steps: int):
+        """Points reachable in exactly `steps` orthogonal moves.
+
+        That is the Manhattan diamond of radius `steps`, keeping only the
+        cells with the same parity as `steps`, built directly.
+        """
         if steps < 1:
             return set()
-        step = 1
-        new = set()
-        results = self.immediate_neighbors
-        while step <= steps:
-            new = set()
-            for p in results:
-                new.update(p.immediate_neighbors)
-            results = new
-            step += 1
-        return new
+        points = set()
+        for dx in range(-steps, steps + 1):
+            rest = steps - abs(dx)
+            for dy in range(-rest, rest + 1, 2):
+                points.add(Point(self.x + dx, self.y + dy))
+        return points
 
+    @property
+    def key(self) -> int:
+        return pack_point(self.x, self.y)
+
+    @classmethod
+    def from_key(cls, key: int) -> 'Point':
+        return cls(*unpack_point(key))
 
     @property
     def diagonal_neighbors(self):
@@ -166,7 +398,7 @@ class Point:
         return new
 
 
-def parse_file(input_type: InputType):
+def input_path(input_type: InputType) -> pathlib.Path:
     match input_type:
         case InputType.INPUT:
             filepath = './input.txt'
@@ -180,11 +412,137 @@ def parse_file(input_type: InputType):
             filepath = './example4.txt'
         case _:
             raise ValueError
+    return pathlib.Path(filepath)
+
+
+Source = InputType | str | pathlib.Path
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_input(source: Source):
+    """Open an input as a binary stream, decompressing gzip on the fly.
+
+    `source` is an InputType, a path, or '-' for stdin. Gzip is detected
+    from the magic bytes, so the file extension does not matter.
+    """
+    if isinstance(source, InputType):
+        source = input_path(source)
+    if str(source) == '-':
+        stream = sys.stdin.buffer
+        if stream.peek(2)[:2] == GZIP_MAGIC:
+            return gzip.GzipFile(fileobj=stream)
+        return nullcontext(stream)
+    with open(source, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    # gzip.open owns the file it opens, GzipFile(fileobj=...) would not
+    # close it
+    return gzip.open(source) if compressed else open(source, 'rb')
+
+
+def iter_lines(source: Source, encoding: str = 'utf-8') -> Iterator[str]:
+    """Lazily yield the lines of an input without their line endings."""
+    with open_input(source) as f:
+        # newline=None gives the same universal newlines as open(..., 'r')
+        text = io.TextIOWrapper(f, encoding=encoding, newline=None)
+        try:
+            for line in text:
+                yield line.rstrip('\n')
+        finally:
+            text.detach()
+
+
+# bytes scanned for newlines at a time by LineIndex
+LINE_INDEX_BLOCK = 1 << 24
+
+
+def _map_file(f) -> mmap.mmap | None:
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # empty files cannot be mapped
+        return None
+
+
+class LineIndex(Sequence):
+    """Random access to the lines of an input without splitting it up front.
+
+    Plain files are memory-mapped; gzip and stdin inputs are first copied
+    block by block to a temporary file that is mapped instead. Newlines are
+    found a block at a time too, so only the line offsets (16 bytes per
+    line) are held in memory; each line is decoded when it is accessed.
+    """
 
-    with open(filepath) as f:
-        data = [s.strip('\n') for s in f.readlines()]
+    def __init__(self, source: Source, encoding: str = 'utf-8',
+                 block_size: int = LINE_INDEX_BLOCK):
+        self.encoding = encoding
+        if isinstance(source, InputType):
+            source = input_path(source)
+        with open_input(source) as f:
+            if isinstance(f, gzip.GzipFile) or str(source) == '-':
+                import shutil
+                import tempfile
+                # the mapping outlives the file, which is deleted on close
+                with tempfile.TemporaryFile() as spool:
+                    shutil.copyfileobj(f, spool, block_size)
+                    spool.flush()
+                    self._mmap = _map_file(spool)
+            else:
+                self._mmap = _map_file(f)
+        data = b'' if self._mmap is None else self._mmap
+        self.buffer = memoryview(data)
+        size = len(data)
+        newlines = [np.zeros(0, dtype=np.int64)]
+        for offset in range(0, size, block_size):
+            block = np.frombuffer(data, dtype=np.uint8, offset=offset,
+                                  count=min(block_size, size - offset))
+            newlines.append(np.flatnonzero(block == ord('\n')) + offset)
+            del block
+        newlines = np.concatenate(newlines)
+        ends = newlines
+        if size and data[-1:] != b'\n':
+            ends = np.append(newlines, size)
+        self.starts = np.concatenate(([0], newlines + 1))[:len(ends)]
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def line_bytes(self, index: int) -> memoryview:
+        """The raw bytes of a line (without line ending), zero-copy."""
+        start, end = int(self.starts[index]), int(self.ends[index])
+        if end > start and self.buffer[end - 1] == ord('\r'):
+            end -= 1
+        return self.buffer[start:end]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return str(self.line_bytes(index), self.encoding)
+
+    def close(self):
+        """Let go of the input. It is unmapped right away unless views from
+        `buffer` or `line_bytes` are still alive, in which case it goes
+        when the last of them does."""
+        buffer, mapping = self.buffer, self._mmap
+        self.buffer, self._mmap = memoryview(b''), None
+        try:
+            buffer.release()
+            if mapping is not None:
+                mapping.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_file(input_type: Source):
+    return list(iter_lines(input_type))
 
-    return data
 
 class Direction8(Enum):
     N = 0
@@ -196,6 +554,81 @@ class Direction8(Enum):
     W = 6
     NW = 7
 
+    @property
+    def offset(self) -> tuple[int, int]:
+        """(dx, dy) of one step, with y increasing southwards."""
+        return DIRECTION8_OFFSETS[self.value]
+
+
+DIRECTION8_OFFSETS = ((0, -1), (1, -1), (1, 0), (1, 1),
+                      (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+
+def neighbor_counts(mask: 'np.ndarray',
+                    directions: type[Enum] = Direction8) -> 'np.ndarray':
+    """Count the set neighbours of every cell of a 2-D boolean mask.
+
+    This is a convolution with the 4- (Direction) or 8-neighbour
+    (Direction8) stencil, done as one shifted slice-add per direction.
+    Cells outside the mask count as unset.
+    """
+    height, width = mask.shape
+    padded = np.pad(mask.astype(np.uint8), 1)
+    counts = np.zeros(mask.shape, dtype=np.uint8)
+    for direction in directions:
+        dx, dy = direction.offset
+        counts += padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+    return counts
+
+
+@dataclass
+class Grid:
+    """A character grid stored as a 2-D uint8 array indexed [y, x]."""
+    cells: 'np.ndarray'
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[str], fill: str = ' ') -> 'Grid':
+        """Build a grid from text lines, padding ragged lines with fill."""
+        width = max((len(line) for line in lines), default=0)
+        text = ''.join(line.ljust(width, fill) for line in lines)
+        cells = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+        return cls(cells.reshape(len(lines), width).copy())
+
+    @property
+    def height(self) -> int:
+        return self.cells.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.cells.shape[1]
+
+    def to_lines(self) -> list[str]:
+        return [row.tobytes().decode('ascii') for row in self.cells]
+
+    def __str__(self) -> str:
+        return '\n'.join(self.to_lines())
+
+    def __getitem__(self, point: Point) -> str:
+        return chr(self.cells[point.y, point.x])
+
+    def mask(self, chars: str) -> 'np.ndarray':
+        """Boolean array of the cells holding any of chars."""
+        return np.isin(self.cells, np.frombuffer(chars.encode('ascii'),
+                                                 dtype=np.uint8))
+
+    def count_neighbors(self, chars: str,
+                        directions: type[Enum] = Direction8) -> 'np.ndarray':
+        return neighbor_counts(self.mask(chars), directions)
+
+    @staticmethod
+    def select(mask: 'np.ndarray') -> set[Point]:
+        """The points of the set cells of a mask."""
+        ys, xs = np.nonzero(mask)
+        return {Point(x, y) for x, y in zip(xs.tolist(), ys.tolist())}
+
+    def points(self, chars: str) -> set[Point]:
+        return self.select(self.mask(chars))
+
 
 def get_last_index(a: list | tuple) -> int:
   for i, e in enumerate(reversed(a)):
@@ -204,37 +637,134 @@ def get_last_index(a: list | tuple) -> int:
   return -1
 
 
-def scalar_digit_multiply(number: tuple[int, ...], digit: int):
-    result = []
+# Digit tuples are big-endian sequences of decimal digits. Internally they
+# are converted to little-endian lists of base 10**9 limbs, so each Python
+# level operation handles nine digits at once.
+LIMB_DIGITS = 9
+LIMB_BASE = 10 ** LIMB_DIGITS
+# below this many limbs schoolbook multiplication beats Karatsuba
+KARATSUBA_THRESHOLD = 40
+
+
+def digits_to_limbs(digits: Sequence[int]) -> list[int]:
+    limbs = []
+    for end in range(len(digits), 0, -LIMB_DIGITS):
+        limb = 0
+        for d in digits[max(0, end - LIMB_DIGITS):end]:
+            limb = limb * 10 + d
+        limbs.append(limb)
+    return limbs or [0]
+
+
+def limbs_to_digits(limbs: list[int], min_length: int = 1) -> tuple[int, ...]:
+    """Digits of a limb list, zero-padded on the left to min_length."""
+    top = len(limbs) - 1
+    while top > 0 and limbs[top] == 0:
+        top -= 1
+    text = str(limbs[top]) + ''.join(f'{limbs[i]:09d}'
+                                     for i in range(top - 1, -1, -1))
+    digits = tuple(b - 48 for b in text.encode('ascii'))
+    if text == '0':
+        digits = ()
+    return (0,) * (min_length - len(digits)) + digits
+
+
+def _normalise(limbs: list[int]) -> list[int]:
+    """Propagate carries in place so every limb is below LIMB_BASE."""
     carry = 0
-    for n in reversed(number):
-        ans = str(n * digit + carry)
-        if len(ans) > 1:
-            carry = int(ans[:-1])
-            ans = ans[-1]
-        else:
-            carry = 0
-        result.insert(0, int(ans))
-    if carry > 0:
-        result.insert(0, carry)
-    return result
+    for i, limb in enumerate(limbs):
+        carry, limbs[i] = divmod(limb + carry, LIMB_BASE)
+    while carry:
+        carry, limb = divmod(carry, LIMB_BASE)
+        limbs.append(limb)
+    while len(limbs) > 1 and limbs[-1] == 0:
+        limbs.pop()
+    return limbs
 
 
-def long_sum(data: list[list[int]]) -> tuple[int, ...]:
+def _add_into(target: list[int], limbs: list[int], shift: int = 0) -> None:
     carry = 0
-    result = []
-    while any([len(row) > 0 for row in data]):
-        total = sum([row.pop() for row in data if len(row) > 0])
-        ans = str(total + carry)
-        if len(ans) > 1:
-            carry = int(ans[:-1])
-            ans = ans[-1]
-        else:
-            carry = 0
-        result.insert(0, int(ans))
-    if carry > 0:
-        result.insert(0, carry)
-    return tuple(result)
+    i = shift
+    for limb in limbs:
+        carry, target[i] = divmod(target[i] + limb + carry, LIMB_BASE)
+        i += 1
+    while carry:
+        carry, target[i] = divmod(target[i] + carry, LIMB_BASE)
+        i += 1
+
+
+def _add(a: list[int], b: list[int]) -> list[int]:
+    if len(a) < len(b):
+        a, b = b, a
+    result = a + [0]
+    _add_into(result, b)
+    return _normalise(result)
+
+
+def _subtract(a: list[int], b: list[int]) -> list[int]:
+    """a - b for a >= b."""
+    result = a[:]
+    borrow = 0
+    for i in range(len(result)):
+        value = result[i] - borrow - (b[i] if i < len(b) else 0)
+        borrow = value < 0
+        result[i] = value + LIMB_BASE if borrow else value
+    return _normalise(result)
+
+
+def _schoolbook_multiply(a: list[int], b: list[int]) -> list[int]:
+    result = [0] * (len(a) + len(b))
+    for i, x in enumerate(a):
+        if x == 0:
+            continue
+        carry = 0
+        for j, y in enumerate(b, i):
+            carry, result[j] = divmod(result[j] + x * y + carry, LIMB_BASE)
+        result[i + len(b)] += carry
+    return _normalise(result)
+
+
+def multiply_limbs(a: list[int], b: list[int]) -> list[int]:
+    """Karatsuba multiplication of limb lists, schoolbook for small ones."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) < KARATSUBA_THRESHOLD:
+        return _schoolbook_multiply(a, b)
+    result = [0] * (len(a) + len(b) + 1)
+    if 2 * len(a) <= len(b):
+        # unbalanced, multiply by len(a)-sized slices of b
+        for start in range(0, len(b), len(a)):
+            _add_into(result, multiply_limbs(a, b[start:start + len(a)]),
+                      start)
+        return _normalise(result)
+    m = len(b) // 2
+    a0, a1 = a[:m], a[m:]
+    b0, b1 = b[:m], b[m:]
+    z0 = multiply_limbs(a0, b0)
+    z2 = multiply_limbs(a1, b1)
+    z1 = _subtract(_subtract(multiply_limbs(_add(a0, a1), _add(b0, b1)),
+                             z0), z2)
+    _add_into(result, z0)
+    _add_into(result, z1, m)
+    _add_into(result, z2, 2 * m)
+    return _normalise(result)
+
+
+def scalar_digit_multiply(number: tuple[int, ...], digit: int):
+    limbs = [limb * digit for limb in digits_to_limbs(number)]
+    return list(limbs_to_digits(_normalise(limbs), len(number)))
+
+
+def long_sum(data: list[list[int]]) -> tuple[int, ...]:
+    """Column sum of digit rows (right aligned). The rows are not modified."""
+    length = max((len(row) for row in data), default=0)
+    if length == 0:
+        return ()
+    total = [0] * (length // LIMB_DIGITS + 1)
+    for row in data:
+        for i, limb in enumerate(digits_to_limbs(row)):
+            total[i] += limb
+    return limbs_to_digits(_normalise(total), length)
 
 
 def long_multiply(num1: tuple[int, ...], num2: tuple[int, ...]) -> tuple[int, ...]:
@@ -248,20 +778,48 @@ def long_multiply(num1: tuple[int, ...], num2: tuple[int, ...]) -> tuple[int, ..
     ........
     --------
 
+    but done on base 10**9 limbs, with Karatsuba for large operands.
+    The result has at least len(num1) + len(num2) - 1 digits.
+
     :param num1:
     :param num2:
     :return:
     """
-    results = []
-    for i, n in enumerate(reversed(num2)):
-        result = scalar_digit_multiply(num1, n)
-        result.extend([0 for _ in range(i)])
-        results.append(result)
+    if not num2:
+        return ()
+    product = multiply_limbs(digits_to_limbs(num1), digits_to_limbs(num2))
+    return limbs_to_digits(product, len(num1) + len(num2) - 1)
 
-    return long_sum(results)
 
+PARALLEL_PRODUCT_MIN = 10_000
 
-@dataclass(frozen=True)
+
+def product_tree(numbers: Iterable[int], workers: int = None) -> int:
+    """The exact product of numbers, multiplying neighbours pairwise.
+
+    A left-to-right product multiplies an ever growing total by small
+    factors, which is quadratic in the size of the result. Pairing keeps
+    both operands of every multiplication about the same size, so CPython's
+    Karatsuba multiply does the heavy lifting. With workers, long inputs
+    are split into one chunk per process and the chunk products are
+    combined here.
+    """
+    numbers = list(numbers)
+    if workers and workers > 1 and len(numbers) >= PARALLEL_PRODUCT_MIN:
+        from concurrent.futures import ProcessPoolExecutor
+        size = math.ceil(len(numbers) / workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            numbers = list(executor.map(product_tree,
+                                        chunk_list(numbers, size)))
+    while len(numbers) > 1:
+        paired = [a * b for a, b in zip(numbers[::2], numbers[1::2])]
+        if len(numbers) % 2:
+            paired.append(numbers[-1])
+        numbers = paired
+    return numbers[0] if numbers else 1
+
+
+@dataclass(frozen=True, slots=True)
 class Vector:
     x: int
     y: int
@@ -325,18 +883,83 @@ class Vector:
                           math.gcd(self.y, other.y))
 
 
+def _xy(key) -> tuple[int, int]:
+    return key if isinstance(key, tuple) else (key.x, key.y)
+
+
+def _scale(width: int, height: int,
+           max_size: tuple[int, int] = None) -> tuple[int, int]:
+    if max_size is None:
+        return 1, 1
+    return (max(1, math.ceil(width / max_size[0])),
+            max(1, math.ceil(height / max_size[1])))
+
+
+def _render_array(codes: 'np.ndarray',
+                  bounds: tuple[int, int, int, int] = None,
+                  max_size: tuple[int, int] = None) -> str:
+    if bounds is not None:
+        xmin, ymin, xmax, ymax = bounds
+        codes = codes[max(ymin, 0):ymax + 1, max(xmin, 0):xmax + 1]
+    step_x, step_y = _scale(codes.shape[1], codes.shape[0], max_size)
+    codes = codes[::step_y, ::step_x]
+    height, width = codes.shape
+    if height == 0:
+        return ''
+    out = np.empty((height, width + 1), dtype=np.uint8)
+    out[:, :width] = codes
+    out[:, width] = ord('\n')
+    return out.tobytes()[:-1].decode('ascii')
+
+
+def _render_mapping(cells: Mapping, background: str = '.',
+                    bounds: tuple[int, int, int, int] = None,
+                    max_size: tuple[int, int] = None) -> str:
+    if bounds is None:
+        if not cells:
+            return ''
+        xs, ys = zip(*(_xy(key) for key in cells))
+        bounds = min(xs), min(ys), max(xs), max(ys)
+    xmin, ymin, xmax, ymax = bounds
+    step_x, step_y = _scale(xmax - xmin + 1, ymax - ymin + 1, max_size)
+    width = (xmax - xmin) // step_x + 1
+    height = (ymax - ymin) // step_y + 1
+    row_length = width + 1
+    buffer = bytearray((background * width + '\n').encode('ascii')) * height
+    for key, char in cells.items():
+        x, y = _xy(key)
+        if xmin <= x <= xmax and ymin <= y <= ymax:
+            buffer[(y - ymin) // step_y * row_length
+                   + (x - xmin) // step_x] = ord(char)
+    return buffer[:-1].decode('ascii')
+
+
+def render(cells: 'Mapping | np.ndarray | Grid', background: str = '.',
+           bounds: tuple[int, int, int, int] = None,
+           max_size: tuple[int, int] = None) -> str:
+    """Render cells as rows of text, writing each cell once into a buffer.
+
+    `cells` is either a mapping from (x, y) tuples, Points or Vectors to
+    single characters (anything missing is `background`), or a 2-D array
+    of character codes indexed [y, x], or a Grid.
+
+    `bounds` = (xmin, ymin, xmax, ymax), inclusive, crops the output and
+    defaults to the extent of the cells. Extents larger than `max_size` =
+    (width, height) are downsampled by an integer factor; for mappings the
+    last entry that lands in a cell wins.
+    """
+    if isinstance(cells, Mapping):
+        return _render_mapping(cells, background, bounds, max_size)
+    if isinstance(cells, Grid):
+        cells = cells.cells
+    return _render_array(cells, bounds, max_size)
+
+
 def visualise(points: dict[Point, str], filepath: pathlib.Path = None,
               print_: bool = False):
     xmax = max({p.x for p in points})
     ymax = max({p.y for p in points})
-    data = [['.' for __ in range(xmax)] for _ in range(ymax)]
-    for i in range(xmax):
-        for j in range(ymax):
-            p = Point(i, j)
-            string = points[p]
-            data[j][i] = string
-    rows = [''.join(row) for row in data]
-    string = '\n'.join(rows)
+    string = render(points, bounds=(0, 0, xmax, ymax))
     if print_ is True:
         print(string)
     if filepath is not None:
@@ -344,6 +967,87 @@ def visualise(points: dict[Point, str], filepath: pathlib.Path = None,
             f.write(string)
 
 
+class FrameSink:
+    """Writes visualisation frames on background workers, sampling steps.
+
+    Solvers ask `wants()` once per step and only build a snapshot when it
+    returns True, then hand it over with `put()`. The writer is called as
+    writer(snapshot, frame_number) on a thread (or process) pool. At most
+    `max_pending` frames are queued; `put()` blocks beyond that so a slow
+    writer throttles the solver instead of piling up snapshots.
+
+    A sink without a writer (NO_FRAMES) never wants a frame, so it is the
+    default for every solver.
+
+        with FrameSink(write_frame, every=10, max_frames=500) as frames:
+            part2(data, frames)
+    """
+
+    def __init__(self, writer: Callable[[object, int], None] = None,
+                 every: int = 1, max_frames: int = None, workers: int = 1,
+                 max_pending: int = 8, processes: bool = False):
+        self.writer = writer
+        self.every = every
+        self.max_frames = max_frames
+        self.workers = workers
+        self.processes = processes
+        self.steps = 0
+        self.frames = 0
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._errors = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.writer is not None
+
+    def wants(self) -> bool:
+        """Count a step and say whether it should become a frame."""
+        if not self.enabled:
+            return False
+        step = self.steps
+        self.steps += 1
+        if self.max_frames is not None and self.frames >= self.max_frames:
+            return False
+        return step % self.every == 0
+
+    def put(self, snapshot) -> None:
+        if not self.enabled:
+            return
+        if self._executor is None:
+            from concurrent.futures import (ProcessPoolExecutor,
+                                            ThreadPoolExecutor)
+            executor = (ProcessPoolExecutor if self.processes
+                        else ThreadPoolExecutor)
+            self._executor = executor(max_workers=self.workers)
+        self._pending.acquire()
+        future = self._executor.submit(self.writer, snapshot, self.frames)
+        future.add_done_callback(self._done)
+        self.frames += 1
+
+    def _done(self, future) -> None:
+        self._pending.release()
+        if future.exception() is not None:
+            self._errors.append(future.exception())
+
+    def close(self) -> None:
+        """Wait for the queued frames and re-raise the first writer error."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self) -> 'FrameSink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+NO_FRAMES = FrameSink()
+
+
 @dataclass(frozen=True)
 class Interval:
     start: int
@@ -369,37 +1073,236 @@ class Interval:
 
 @dataclass
 class IntervalCollection:
-    intervals: set[Interval]
+    """A set of integers stored as sorted, non-overlapping intervals.
+
+    Intervals that overlap or touch (e.g. [1, 3] and [4, 6]) are merged on
+    the way in, so `intervals` is always in canonical form and the number
+    of integers covered is kept up to date.
+    """
+    intervals: list[Interval] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._set_sorted(self._merge_sorted(sorted(self.intervals,
+                                                   key=_interval_start)))
+
+    @classmethod
+    def _from_sorted(cls, intervals: list[Interval]) -> 'IntervalCollection':
+        collection = cls()
+        collection._set_sorted(intervals)
+        return collection
+
+    def _set_sorted(self, intervals: list[Interval]) -> None:
+        self.intervals = intervals
+        self._starts = [interval.start for interval in intervals]
+        self._total = sum(interval.calc_valid_count()
+                          for interval in intervals)
+
+    @staticmethod
+    def _merge_sorted(intervals: Iterable[Interval]) -> list[Interval]:
+        merged = []
+        for interval in intervals:
+            if merged and interval.start <= merged[-1].end + 1:
+                if interval.end > merged[-1].end:
+                    merged[-1] = Interval(merged[-1].start, interval.end)
+            else:
+                merged.append(interval)
+        return merged
 
     @property
     def count(self) -> int:
         return len(self.intervals)
 
+    def __iter__(self) -> Iterator[Interval]:
+        return iter(self.intervals)
+
     def add_interval(self, interval: Interval):
-        initial_intervals = self.intervals.copy()
-        overlaps = False
-        for existing in initial_intervals:
-            if existing.overlaps(interval):
-                overlaps = True
-                new = existing.combine_overlapping(interval)
-                self.intervals.remove(existing)
-                self.intervals.add(new)
-        if not overlaps:
-            self.intervals.add(interval)
+        """Insert an interval, merging it with any it overlaps or touches.
+
+        The affected intervals are found by bisection in O(log n), but
+        replacing them is a list splice that shifts the intervals after
+        them, so an insert is O(n) overall. The shift is a single memmove,
+        cheap up to about 10**5 intervals (~15 us); beyond that, build the
+        collection from all intervals at once, which sorts and sweeps in
+        O(n log n).
+        """
+        lo = bisect.bisect_left(self._starts, interval.start)
+        if lo > 0 and self.intervals[lo - 1].end >= interval.start - 1:
+            lo -= 1
+        hi = bisect.bisect_right(self._starts, interval.end + 1)
+        start, end = interval.start, interval.end
+        for existing in self.intervals[lo:hi]:
+            start = min(start, existing.start)
+            end = max(end, existing.end)
+            self._total -= existing.calc_valid_count()
+        merged = Interval(start, end)
+        self.intervals[lo:hi] = [merged]
+        self._starts[lo:hi] = [start]
+        self._total += merged.calc_valid_count()
 
     def consolidate_intervals(self):
-        num_intervals = self.count
-        while True:
-            self._consolidate_intervals_once()
-            if self.count == num_intervals:
-                break
-            num_intervals = self.count
+        """Merge overlapping intervals in one sorted pass.
 
-    def _consolidate_intervals_once(self):
-        consolidated = IntervalCollection(set())
+        Intervals are kept consolidated as they are added, this is only
+        needed if `intervals` was modified directly.
+        """
+        self._set_sorted(self._merge_sorted(sorted(self.intervals,
+                                                   key=_interval_start)))
+
+    def calc_valid_count(self) -> int:
+        """How many integers the collection covers, in O(1)."""
+        return self._total
+
+    def is_in(self, value: int) -> bool:
+        index = bisect.bisect_right(self._starts, value) - 1
+        return index >= 0 and value <= self.intervals[index].end
+
+    def __contains__(self, value: int) -> bool:
+        return self.is_in(value)
+
+    def union(self, other: 'IntervalCollection') -> 'IntervalCollection':
+        combined = heapq.merge(self.intervals, other.intervals,
+                               key=_interval_start)
+        return self._from_sorted(self._merge_sorted(combined))
+
+    def intersection(self,
+                     other: 'IntervalCollection') -> 'IntervalCollection':
+        result = []
+        i = j = 0
+        while i < self.count and j < other.count:
+            a, b = self.intervals[i], other.intervals[j]
+            start, end = max(a.start, b.start), min(a.end, b.end)
+            if start <= end:
+                result.append(Interval(start, end))
+            if a.end < b.end:
+                i += 1
+            else:
+                j += 1
+        return self._from_sorted(result)
+
+    def complement(self, bounds: Interval) -> 'IntervalCollection':
+        """The integers within bounds that are not in the collection."""
+        result = []
+        position = bounds.start
         for interval in self.intervals:
-            consolidated.add_interval(interval)
-        self.intervals = consolidated.intervals
+            if interval.end < position:
+                continue
+            if interval.start > bounds.end:
+                break
+            if interval.start > position:
+                result.append(Interval(position, interval.start - 1))
+            position = interval.end + 1
+        if position <= bounds.end:
+            result.append(Interval(position, bounds.end))
+        return self._from_sorted(result)
+
+    def difference(self, other: 'IntervalCollection') -> 'IntervalCollection':
+        if not self.intervals:
+            return self._from_sorted([])
+        bounds = Interval(self.intervals[0].start, self.intervals[-1].end)
+        return self.intersection(other.complement(bounds))
+
+
+def _interval_start(interval: Interval) -> int:
+    return interval.start
+
+
+class IntervalIndex:
+    """A frozen IntervalCollection as sorted NumPy arrays, for membership
+    queries in bulk.
+
+    Single values are found by binary search, arrays of values with one
+    `searchsorted` call and sorted streams by walking the intervals
+    alongside them.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        if not isinstance(intervals, IntervalCollection):
+            intervals = IntervalCollection(list(intervals))
+        self.starts = np.array([i.start for i in intervals], dtype=np.int64)
+        self.ends = np.array([i.end for i in intervals], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def is_in(self, value: int) -> bool:
+        index = int(np.searchsorted(self.starts, value, side='right')) - 1
+        return index >= 0 and value <= self.ends[index]
+
+    def __contains__(self, value: int) -> bool:
+        return self.is_in(value)
+
+    def contains(self, values: 'np.ndarray') -> 'np.ndarray':
+        """Boolean array of which values fall in an interval."""
+        values = np.asarray(values, dtype=np.int64)
+        if not len(self):
+            return np.zeros(values.shape, dtype=bool)
+        index = np.searchsorted(self.starts, values, side='right') - 1
+        return (index >= 0) & (values <= self.ends[index])
+
+    def count_in(self, values: 'np.ndarray') -> int:
+        # searchsorted is several times faster on sorted values as each
+        # search starts from the last one, and sorting costs less than that
+        return int(np.count_nonzero(self.contains(np.sort(values))))
+
+    def filter_sorted(self, values: Iterable[int]) -> Iterator[int]:
+        """Yield the values that fall in an interval from an ascending
+        stream, in O(values + intervals) without holding the stream."""
+        starts, ends = self.starts.tolist(), self.ends.tolist()
+        i, previous = 0, None
+        for value in values:
+            if previous is not None and value < previous:
+                raise ValueError(f'stream not sorted: {value} after {previous}')
+            previous = value
+            while i < len(ends) and ends[i] < value:
+                i += 1
+            if i == len(ends):
+                return
+            if starts[i] <= value:
+                yield value
+
+
+class DisjointSet:
+    """Union-find over the items 0..n-1, with path compression and union by
+    size, keeping count of the components as they merge."""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+        self.count = n
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, a: int, b: int) -> bool:
+        """Merge the components of a and b; False if they were already
+        one."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        self.count -= 1
+        return True
+
+    def connected(self, a: int, b: int) -> bool:
+        return self.find(a) == self.find(b)
+
+    def component_size(self, item: int) -> int:
+        return self.size[self.find(item)]
+
+    def component_sizes(self) -> list[int]:
+        return [self.size[i] for i, p in enumerate(self.parent) if i == p]
 
 
 @dataclass(frozen=True)
@@ -0,0 +1,132 @@
+"""Micro-benchmarks for the shared helpers in aoc.
+
+    python benchmarks.py neighbors
+"""
+import argparse
+import random
+import sys
+import tracemalloc
+
+from aoc import (Direction8, Point, TimeUnit, benchmark, long_multiply,
+                 packed_neighbors, packed_offsets)
+
+
+def traced_peak(f, *args) -> int:
+    """Peak bytes allocated while running f(*args)."""
+    tracemalloc.start()
+    f(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def bench_neighbors(n: int = 1_000_000, repeats: int = 3):
+    """Time per n 8-neighbour queries, Point objects vs packed ints, and the
+    memory needed to keep the neighbourhoods of n // 10 points in a set."""
+    side = int(n ** 0.5)
+    points = [Point(i % side, i // side) for i in range(n)]
+    keys = [p.key for p in points]
+    offsets = packed_offsets(Direction8)
+
+    def point_queries(count):
+        found = set()
+        for p in points[:count]:
+            found.update(p.all_neighbors)
+        return found
+
+    def packed_queries(count):
+        found = set()
+        for key in keys[:count]:
+            found.update(packed_neighbors(key, offsets))
+        return found
+
+    def diamond_queries(count):
+        for p in points[:count]:
+            p.immediate_neighbors_after(10)
+
+    print(f'bytes per Point: {sys.getsizeof(points[0])}, '
+          f'per packed key: {sys.getsizeof(keys[0])}')
+    for name, f in (('Point.all_neighbors', point_queries),
+                    ('packed_neighbors', packed_queries)):
+        result = benchmark(f, n, repeats=repeats, warmup=0)
+        peak = traced_peak(f, n // 10)
+        print(f'{name}: {result.summary(TimeUnit.ms)}, '
+              f'peak for {n // 10} queries {peak / 2**20:.1f} MiB')
+    result = benchmark(diamond_queries, n // 1000, repeats=repeats, warmup=0)
+    print(f'immediate_neighbors_after(10) x{n // 1000}: '
+          f'{result.summary(TimeUnit.ms)}')
+
+
+def legacy_long_multiply(num1: tuple[int, ...],
+                         num2: tuple[int, ...]) -> tuple[int, ...]:
+    """The digit-at-a-time long multiplication aoc used to have, kept as a
+    baseline."""
+    results = []
+    for i, n in enumerate(reversed(num2)):
+        result = []
+        carry = 0
+        for d in reversed(num1):
+            ans = str(d * n + carry)
+            if len(ans) > 1:
+                carry = int(ans[:-1])
+                ans = ans[-1]
+            else:
+                carry = 0
+            result.insert(0, int(ans))
+        if carry > 0:
+            result.insert(0, carry)
+        result.extend([0 for _ in range(i)])
+        results.append(result)
+    carry = 0
+    total = []
+    while any([len(row) > 0 for row in results]):
+        column = str(sum([row.pop() for row in results if len(row) > 0])
+                     + carry)
+        carry = int(column[:-1]) if len(column) > 1 else 0
+        total.insert(0, int(column[-1]))
+    if carry > 0:
+        total.insert(0, carry)
+    return tuple(total)
+
+
+def bench_long_multiply(sizes: tuple[int, ...] = (1_000, 10_000, 100_000),
+                        legacy_max: int = 2_000):
+    """long_multiply vs the old digit-at-a-time version vs native int."""
+    sys.set_int_max_str_digits(0)
+    rng = random.Random(0)
+    for size in sizes:
+        a = tuple(rng.randrange(10) for _ in range(size))
+        b = tuple(rng.randrange(10) for _ in range(size))
+        x, y = int(''.join(map(str, a))), int(''.join(map(str, b)))
+        repeats = 3 if size < 100_000 else 1
+        cases = [('long_multiply', long_multiply, a, b),
+                 ('native int', int.__mul__, x, y)]
+        if size <= legacy_max:
+            cases.insert(0, ('legacy', legacy_long_multiply, a, b))
+        for name, f, p, q in cases:
+            result = benchmark(f, p, q, repeats=repeats, warmup=0)
+            print(f'{size} digits, {name}: {result.summary(TimeUnit.ms)}')
+
+
+BENCHMARKS = {
+    'neighbors': bench_neighbors,
+    'long_multiply': bench_long_multiply,
+}
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*',
+                        help=f'benchmarks to run, any of {list(BENCHMARKS)} '
+                             f'(default: all)')
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {sorted(unknown)}')
+    for name in args.names or BENCHMARKS:
+        print(f'--- {name} ---')
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
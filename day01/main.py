@@ -1,5 +1,8 @@
-from aoc import InputType, parse_file
+from aoc import InputType, LineIndex, Source, TimeUnit, benchmark
 from dataclasses import dataclass
+import random
+
+import numpy as np
 
 
 @dataclass
@@ -36,33 +39,238 @@ class Dial:
             self.counter += 1
 
 
-def part1():
-    data = parse_file(InputType.INPUT)
-    safe = Dial()
-    for row in data:
-        if 'R' in row:
-            safe.increase_by(int(row.replace('R', '')))
-        elif 'L' in row:
-            safe.reduce_by(int(row.replace('L', '')))
-    print(f'Part 1: {safe.counter}')
-    return
+# a line R1234567 (or L...) fills one little-endian 8-byte word, lines are
+# decoded a block at a time so the word arithmetic stays in cache
+WORD = 8
+PARSE_BLOCK = 1 << 14
+LANES = np.uint64(0x0101010101010101)
+
+
+def _fast_rotations(b: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                    carriage_returns: bool) -> tuple[np.ndarray, np.ndarray]:
+    """Decode the lines that are R or L and 1-7 digits (and maybe a \\r)
+    with SWAR arithmetic, as (values, ok).
+
+    Each line is loaded as one word, the letter in its low byte. Shifting
+    left drops the bytes past the line and leaves the digits in the top
+    bytes with zeros below, which read as leading zeros; the digits are
+    then checked and combined in three multiplies. Lines this can't read
+    are left for _slow_rotation.
+    """
+    n = len(starts)
+    values = np.zeros(n, dtype=np.int64)
+    ok = np.zeros(n, dtype=bool)
+    if len(b) < WORD:
+        return values, ok
+    # every offset viewed as an unaligned word; the last few lines may not
+    # have a whole word left and stay with the slow path
+    words = np.ndarray((len(b) - WORD + 1,), dtype='<u8', buffer=b,
+                       strides=(1,))
+    loadable = int(np.searchsorted(starts, len(b) - WORD, side='right'))
+    for lo in range(0, loadable, PARSE_BLOCK):
+        hi = min(lo + PARSE_BLOCK, loadable)
+        word = words[starts[lo:hi]]
+        length = ends[lo:hi] - starts[lo:hi]
+        if carriage_returns:
+            last = ((length - 1) << 3).view(np.uint64)
+            length -= (word >> last & np.uint64(0xFF)) == ord('\r')
+        good = (length - 2).view(np.uint64) <= WORD - 2
+        letter = word & np.uint64(0xFF)
+        left = letter == ord('L')
+        good &= left | (letter == ord('R'))
+        # past 63 numpy shifts give 0, only for lines that aren't good
+        shift = (WORD * 8 - (length << 3)).view(np.uint64)
+        word <<= shift
+        # the letter went up with the digits, just below them
+        digits = ~np.uint64(0) << shift + np.uint64(8)
+        word &= digits
+        # digits are 0x30-0x39: high nibble 3 and low nibble + 6 below 16
+        good &= (word & LANES * np.uint64(0xF0)) == (
+            digits & LANES * np.uint64(0x30))
+        word &= LANES * np.uint64(0x0F)
+        good &= (word + LANES * np.uint64(6) & LANES * np.uint64(0x10)) == 0
+        # pairs of digits, pairs of pairs, then the two halves
+        word = (word * np.uint64(10 << 8 | 1)) >> np.uint64(8)
+        word &= np.uint64(0x00FF00FF00FF00FF)
+        word = (word * np.uint64(100 << 16 | 1)) >> np.uint64(16)
+        word &= np.uint64(0x0000FFFF0000FFFF)
+        word = (word * np.uint64(10000 << 32 | 1)) >> np.uint64(32)
+        block = values[lo:hi]
+        block[:] = word.view(np.int64)
+        np.negative(block, out=block, where=left)
+        ok[lo:hi] = good
+    return values, ok
+
+
+def _slow_rotation(line: bytes, number: int) -> int | None:
+    """One line the fast path couldn't read: None for a line to skip,
+    otherwise its signed rotation. Spaces around the line and after its
+    letter are ignored."""
+    line = line.strip()
+    if not line or line[:1] not in (b'R', b'L'):
+        return None
+    digits_ = line[1:].lstrip()
+    if not digits_.isdigit():
+        raise ValueError(f'bad rotation on line {number + 1}: '
+                         f'{line.decode(errors="replace")!r}')
+    return -int(digits_) if line[:1] == b'L' else int(digits_)
+
+
+def parse_rotations(text: bytes | str, starts: np.ndarray = None,
+                    ends: np.ndarray = None) -> np.ndarray:
+    """Signed rotation amounts, R positive and L negative, one per line.
+
+    `starts` and `ends` are line offsets into `text` as LineIndex has them,
+    and are found here if not given. Spaces around a line and after its
+    letter are ignored, and lines that don't start with R or L are skipped;
+    an R or L without a whole number after it raises ValueError.
+    """
+    if isinstance(text, str):
+        text = text.encode()
+    b = np.frombuffer(text, dtype=np.uint8)
+    if starts is None:
+        newlines = np.flatnonzero(b == ord('\n'))
+        starts = np.concatenate(([0], newlines + 1))
+        ends = np.append(newlines, len(b))
+    if isinstance(text, memoryview):
+        text = text.obj
+    # mmap and bytes find with memchr, much faster than a NumPy pass
+    values, ok = _fast_rotations(b, starts, ends, text.find(b'\r') >= 0)
+    if ok.all():
+        return values
+    keep = ok.copy()
+    for n in np.flatnonzero(~ok).tolist():
+        value = _slow_rotation(b[starts[n]:ends[n]].tobytes(), n)
+        if value is not None:
+            values[n] = value
+            keep[n] = True
+    return values[keep]
+
+
+def read_rotations(source: Source) -> np.ndarray:
+    with LineIndex(source) as lines:
+        return parse_rotations(lines.buffer, lines.starts, lines.ends)
+
+
+def unwound(rotations: np.ndarray, start: int = 50) -> np.ndarray:
+    """The needle position after each rotation, without wrapping around."""
+    positions = np.cumsum(rotations)
+    positions += start
+    return positions
+
+
+def _dial_size(min: int, max: int) -> int:
+    """Positions on the dial. Dial wraps at max + 1 and never reads min,
+    so a dial that doesn't start at 0 has no reference to match."""
+    if min != 0:
+        raise ValueError(f'min must be 0 to match Dial, not {min}')
+    if max < 0:
+        raise ValueError(f'max must be at least 0, not {max}')
+    return max + 1
 
 
-def part2():
-    data = parse_file(InputType.INPUT)
-    safe = Dial(part2=True)
+def needle_positions(rotations: np.ndarray, start: int = 50, min: int = 0,
+                     max: int = 99) -> np.ndarray:
+    """Where the needle points after each rotation."""
+    return unwound(rotations, start) % _dial_size(min, max)
+
+
+def count_landings(rotations: np.ndarray, start: int = 50, min: int = 0,
+                   max: int = 99) -> int:
+    """Rotations that end with the needle on 0, as Dial counts for part 1."""
+    positions = needle_positions(rotations, start, min, max)
+    return int(np.count_nonzero(positions == 0))
+
+
+def count_clicks(rotations: np.ndarray, start: int = 50, min: int = 0,
+                 max: int = 99) -> int:
+    """Clicks that leave the needle on 0, as Dial counts for part 2."""
+    size = _dial_size(min, max)
+    if not len(rotations):
+        return 0
+    positions = unwound(rotations, start)
+    # every multiple of size between two unwound positions is a pass of 0
+    turns = positions // size
+    on_zero = positions == turns * size
+    was_on_zero = np.concatenate(([start % size == 0], on_zero[:-1]))
+    passes = (abs(int(turns[0]) - start // size)
+              + int(np.abs(np.diff(turns)).sum()))
+    # turning left, floor division counts leaving 0 rather than arriving
+    left = rotations < 0
+    passes += int(np.count_nonzero(on_zero & left)
+                  - np.count_nonzero(was_on_zero & left))
+    # Dial counts whole turns that start on 0 once more, as a landing
+    return passes + int(np.count_nonzero(on_zero & was_on_zero))
+
+
+def count_with_dial(data: list[str], part2: bool = False, **dial) -> int:
+    """One Dial call per line, kept as the reference for the batch engine."""
+    safe = Dial(part2=part2, **dial)
     for row in data:
         if 'R' in row:
             safe.increase_by(int(row.replace('R', '')))
         elif 'L' in row:
             safe.reduce_by(int(row.replace('L', '')))
-    print(f'Part2: {safe.counter}')
-    return
+    return safe.counter
+
+
+def random_rotations(n: int, max_value: int = 99, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [f'{rng.choice("RL")}{rng.randrange(3 * max_value + 3)}'
+            for _ in range(n)]
+
+
+def test_batch_matches_dial():
+    for seed, max_value in enumerate((99, 9, 0, 250)):
+        data = random_rotations(2000, max_value, seed)
+        rotations = parse_rotations('\n'.join(data))
+        start = seed * 7 % (max_value + 1)
+        assert count_landings(rotations, start, max=max_value) == \
+            count_with_dial(data, needle=start, max=max_value)
+        assert count_clicks(rotations, start, max=max_value) == \
+            count_with_dial(data, part2=True, needle=start, max=max_value)
+    assert parse_rotations('L68\r\n\nR0\nR1234\n').tolist() == [-68, 0, 1234]
+    for count in (count_landings, count_clicks):
+        try:
+            count(rotations, min=1)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'{count.__name__} accepted min=1')
+
+
+def benchmark_batch(n: int = 10_000_000, dial_n: int = 200_000):
+    """Lines per second for part 2, the batch engine vs Dial."""
+    data = random_rotations(n)
+    text = '\n'.join(data).encode()
+    batch = benchmark(lambda: count_clicks(parse_rotations(text)),
+                      repeats=3, warmup=0)
+    dial = benchmark(count_with_dial, data[:dial_n], True, repeats=3, warmup=0)
+    batch_rate = n / batch.min_ns * 1e9
+    dial_rate = dial_n / dial.min_ns * 1e9
+    print(f'batch: {batch.summary(TimeUnit.ms)}, {batch_rate:,.0f} lines/s')
+    print(f'Dial:  {dial.summary(TimeUnit.ms)}, {dial_rate:,.0f} lines/s')
+    print(f'speedup: {batch_rate / dial_rate:.0f}x')
+
+
+def part1(rotations: np.ndarray) -> int:
+    return count_landings(rotations)
+
+
+def part2(rotations: np.ndarray) -> int:
+    return count_clicks(rotations)
+
+
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    rotations = read_rotations(input_type)
+    return part1(rotations) if part == 1 else part2(rotations)
 
 
 def main():
-    part1()
-    part2()
+    test_batch_matches_dial()
+    rotations = read_rotations(InputType.INPUT)
+    print(f'Part 1: {part1(rotations)}')
+    print(f'Part2: {part2(rotations)}')
 
 
 if __name__ == '__main__':
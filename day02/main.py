@@ -1,7 +1,14 @@
-from xmlrpc.client import FastUnmarshaller
-
-from aoc import parse_file, InputType, timer
+from aoc import (parse_file, InputType, timer, Interval, IntervalCollection,
+                 chunk_list)
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+from math import prod
+from typing import Iterator
 import functools
+import os
+import sys
+
+import numpy as np
 
 
 
@@ -54,7 +61,7 @@ def is_id_invalid(id_: str):
 
 
 @timer()
-def part1(data: str) -> int:
+def part1_scan(data: list[str]) -> int:
     id_ranges = data.pop().split(',')
     all_invalids = set()
     for id_range in id_ranges:
@@ -68,7 +75,7 @@ def part1(data: str) -> int:
 
 
 @timer()
-def part2(data: str, use_my_func: bool = True) -> int:
+def part2_scan(data: list[str], use_my_func: bool = True) -> int:
     id_ranges = data.pop().split(',')
     all_invalids = set()
     for id_range in id_ranges:
@@ -83,13 +90,185 @@ def part2(data: str, use_my_func: bool = True) -> int:
     return sum(all_invalids)
 
 
-def main():
+def parse_ranges(data: list[str]) -> IntervalCollection:
+    """The ID ranges with overlapping ones merged."""
+    ranges = []
+    for id_range in ''.join(data).split(','):
+        start_id, end_id = id_range.split('-')
+        ranges.append(Interval(int(start_id), int(end_id)))
+    return IntervalCollection(ranges)
+
+
+def repeat_factor(length: int, block: int) -> int:
+    """The multiplier that repeats a `block` digit number out to `length`
+    digits, e.g. 1001001 for (9, 3) as 123 * 1001001 = 123123123."""
+    return (10 ** length - 1) // (10 ** block - 1)
+
+
+def prime_factors(n: int) -> list[int]:
+    factors = []
+    p = 2
+    while p * p <= n:
+        if n % p == 0:
+            factors.append(p)
+            while n % p == 0:
+                n //= p
+        p += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+
+def block_bounds(start: int, end: int, length: int,
+                 block: int) -> tuple[int, int, int]:
+    """The blocks B whose repeats B * factor fall in [start, end], as
+    (factor, first B, last B)."""
+    factor = repeat_factor(length, block)
+    first = max(10 ** (block - 1), -(-start // factor))
+    last = min(10 ** block - 1, end // factor)
+    return factor, first, last
+
+
+def block_lengths(length: int, any_repeat: bool) -> list[tuple[int, int]]:
+    """(block length, sign) pairs whose signed counts add up to each
+    repeated number of `length` digits exactly once.
+
+    Part 1 only wants a block repeated twice. For part 2 every repeated
+    number repeats a block of length // p for some prime p dividing the
+    length, and numbers repeating blocks for several primes are the ones
+    repeating the block of their gcd, so inclusion-exclusion over the
+    prime factors dedupes them (111111 repeats 111, 11 and 1).
+    """
+    if not any_repeat:
+        return [(length // 2, 1)] if length % 2 == 0 else []
+    primes = prime_factors(length)
+    return [(length // prod(subset), (-1) ** (size + 1))
+            for size in range(1, len(primes) + 1)
+            for subset in combinations(primes, size)]
+
+
+def _length_spans(start: int, end: int) -> Iterator[tuple[int, int, int]]:
+    """Split [start, end] into (length, start, end) runs of equal digit
+    count."""
+    for length in range(len(str(start)), len(str(end)) + 1):
+        yield (length, max(start, 10 ** (length - 1)),
+               min(end, 10 ** length - 1))
+
+
+def invalid_id_stats(start: int, end: int,
+                     any_repeat: bool = True) -> tuple[int, int]:
+    """The count and sum of the invalid IDs in [start, end].
+
+    Works from the digit counts alone, so the width of the range does not
+    matter.
+    """
+    count = total = 0
+    for length, lo, hi in _length_spans(start, end):
+        for block, sign in block_lengths(length, any_repeat):
+            factor, first, last = block_bounds(lo, hi, length, block)
+            if first <= last:
+                n = last - first + 1
+                count += sign * n
+                total += sign * factor * (first + last) * n // 2
+    return count, total
+
+
+def invalid_ids(start: int, end: int,
+                any_repeat: bool = True) -> Iterator[int]:
+    """Enumerate the invalid IDs in [start, end] in increasing order."""
+    for length, lo, hi in _length_spans(start, end):
+        found = set()
+        for block, sign in block_lengths(length, any_repeat):
+            if sign > 0:
+                factor, first, last = block_bounds(lo, hi, length, block)
+                found.update(b * factor for b in range(first, last + 1))
+        yield from sorted(found)
+
+
+def _repeats(numbers: np.ndarray, length: int, block: int) -> np.ndarray:
+    """Which `length` digit numbers are unchanged by moving their first
+    `block` digits to the end, the digit version of s in (s + s)[1:-1]."""
+    head = 10 ** (length - block)
+    return (numbers % head) * 10 ** block + numbers // head == numbers
+
+
+def scan_chunk(start: int, stop: int,
+               any_repeat: bool = True) -> tuple[int, int]:
+    """Count and sum the invalid IDs in range(start, stop) by testing every
+    number, a block of int64s at a time (so IDs up to 18 digits)."""
+    count = total = 0
+    for length, lo, hi in _length_spans(start, stop - 1):
+        numbers = np.arange(lo, hi + 1, dtype=np.int64)
+        if any_repeat:
+            blocks = [b for b in range(1, length) if length % b == 0]
+        else:
+            blocks = [length // 2] if length % 2 == 0 else []
+        invalid = np.zeros(len(numbers), dtype=bool)
+        for block in blocks:
+            invalid |= _repeats(numbers, length, block)
+        hits = numbers[invalid].tolist()
+        count += len(hits)
+        total += sum(hits)
+    return count, total
+
+
+def verify(data: list[str], any_repeat: bool = True, workers: int = None,
+           chunk_size: int = 1_000_000) -> tuple[int, int]:
+    """Brute-force count and sum of the invalid IDs, as a cross-check of
+    invalid_id_stats.
+
+    The merged ranges are cut into chunks that are scanned in a process
+    pool. At most two chunks per worker are in flight and only their counts
+    and sums come back, so memory stays flat however wide the ranges are.
+    """
+    workers = workers or os.cpu_count()
+    chunks = (chunk for r in parse_ranges(data)
+              for chunk in chunk_list(range(r.start, r.end + 1), chunk_size))
+    count = total = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for chunk in chunks:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    c, t = future.result()
+                    count, total = count + c, total + t
+            pending.add(executor.submit(scan_chunk, chunk.start, chunk.stop,
+                                        any_repeat))
+        for future in pending:
+            c, t = future.result()
+            count, total = count + c, total + t
+    return count, total
+
+
+@timer()
+def part1(data: list[str]) -> int:
+    return sum(invalid_id_stats(r.start, r.end, any_repeat=False)[1]
+               for r in parse_ranges(data))
+
+
+@timer()
+def part2(data: list[str]) -> int:
+    return sum(invalid_id_stats(r.start, r.end)[1] for r in parse_ranges(data))
+
+
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    data = parse_file(input_type)
+    return part1(data) if part == 1 else part2(data)
+
+
+def main(verify_scan: bool = False):
+    """`verify_scan` (--verify on the command line) also brute-forces part 2
+    in a process pool, which takes far longer than solving it."""
     print(f'Part 1: {part1(parse_file(InputType.INPUT))}')
     print(f'Part 2: {part2(parse_file(InputType.INPUT))}')
-    print(f'Part 2: {part2(parse_file(InputType.INPUT), use_my_func=False)} (using principal period)')
+    print(f'Part 2: {part2_scan(parse_file(InputType.INPUT), use_my_func=False)} (scanning, using principal period)')
+    if verify_scan:
+        print(f'Part 2: {verify(parse_file(InputType.INPUT))[1]} '
+              '(parallel scan)')
 
 
 
 
 if __name__ == '__main__':
-    main()
+    main('--verify' in sys.argv[1:])
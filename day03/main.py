@@ -1,66 +1,109 @@
 from aoc import parse_file, InputType
 
+import numpy as np
 
-def part1(data: str) -> int:
-    joltages = []
-    for row in data:
-        batteries = list(row)
-        best_combo = [batteries[0],
-                      batteries[1]]
-        for i, bat in enumerate(batteries[1:-1]):
-            if int(bat) > int(best_combo[0]):
-                best_combo[0] = bat
-                best_combo[1] = batteries[i + 2]
-            elif int(bat) > int(best_combo[1]):
-                best_combo[1] = bat
-        if int(batteries[-1]) > int(best_combo[1]):
-            best_combo[1] = batteries[-1]
-        joltage = int(''.join(best_combo))
-        joltages.append(joltage)
-    return sum(joltages)
 
+def max_joltage(row: str, digits: int) -> int:
+    """The largest number made of `digits` of the row's digits, in order.
 
-def part2(data: list[str]) -> int:
-    vals = find_max_joltages(data, 12)
-    return sum(vals)
+    Monotonic stack: a digit knocks out smaller ones before it while there
+    are still digits to spare, so each digit is pushed and popped at most
+    once.
+    """
+    if not 0 < digits <= len(row):
+        raise ValueError(f'cannot pick {digits} digits from rows of '
+                         f'{len(row)}')
+    spare = len(row) - digits
+    stack = []
+    for battery in row:
+        while spare and stack and stack[-1] < battery:
+            stack.pop()
+            spare -= 1
+        stack.append(battery)
+    return int(''.join(stack[:digits]))
 
 
 def find_max_joltages(data: list[str], digits: int) -> list[int]:
-    joltages = []
-
-    for ii, row in enumerate(data):
-        batteries = [int(i) for i in list(row)]
-        best_combo = []
-        index = -1
-        while len(best_combo) < digits:
-            j = len(best_combo)
-            h = digits - j
-            end_index = -(h - 1)
-            if end_index == 0:
-                end_index = len(batteries)
-            viable = batteries[index+1:end_index]
-            best_battery = max(viable)
-            best_index = viable.index(best_battery)
-            for i in range(best_index+1):
-                viable[i] = 0
-            batteries[index+1:end_index] = viable
-            if index == -1:
-                index = 0
-            index += best_index
-            best_combo.append(best_battery)
-            line_viz = ''.join([str(b) for b in batteries]) + ' - ' + ''.join([str(c) for c in best_combo])
-            print(line_viz)
-        joltage = int(''.join([str(i) for i in best_combo]))
-        joltages.append(joltage)
+    return [max_joltage(row, digits) for row in data]
+
+
+def digit_rows(data: list[str]) -> np.ndarray:
+    """The rows as a 2-D array of digits; they must all be the same length."""
+    width = len(data[0]) if data else 0
+    if any(len(row) != width for row in data):
+        raise ValueError('rows differ in length')
+    text = ''.join(data).encode()
+    return (np.frombuffer(text, dtype=np.uint8) - ord('0')).reshape(-1, width)
+
+
+def max_joltages_batch(rows: np.ndarray, digits: int,
+                       chunk_rows: int = 1024) -> np.ndarray:
+    """max_joltage for every row of a 2-D digit array at once.
+
+    The greedy pick for the j-th digit is the leftmost largest digit in
+    columns prev + 1 .. n - digits + j. Encoding each cell as
+    digit * (n + 1) + (n - column) makes that a plain maximum, and a
+    reversed running maximum over the first n - digits + 1 columns answers
+    every window that starts there; the up to digits - 1 columns after it
+    are compared directly.
+    """
+    height, n = rows.shape
+    if not 0 < digits <= n:
+        raise ValueError(f'cannot pick {digits} digits from rows of {n}')
+    head = n - digits + 1
+    dtype = np.int32 if 10 * (n + 1) < 2 ** 31 else np.int64
+    joltages = np.zeros(height, dtype=np.int64 if digits <= 18 else object)
+    columns = np.arange(n)
+    for top in range(0, height, chunk_rows):
+        chunk = rows[top:top + chunk_rows]
+        keys = chunk.astype(dtype)
+        keys *= n + 1
+        keys += (n - columns).astype(dtype)
+        # best[r, head - 1 - c] is the best key in columns c .. head - 1
+        best = np.maximum.accumulate(keys[:, head - 1::-1], axis=1)
+        index = np.arange(len(chunk))
+        prev = np.full(len(chunk), -1)
+        for j in range(digits):
+            start = prev + 1
+            pick = np.where(start < head,
+                            best[index, head - 1 - np.minimum(start, head - 1)],
+                            -1)
+            tail = keys[:, head:head + j]
+            if j:
+                tail = np.where(columns[head:head + j] > prev[:, None],
+                                tail, -1)
+                pick = np.maximum(pick, tail.max(axis=1))
+            prev = n - pick % (n + 1)
+            joltages[top:top + chunk_rows] = (
+                joltages[top:top + chunk_rows] * 10 + pick // (n + 1))
     return joltages
 
 
+def total_joltage(data: list[str], digits: int) -> int:
+    if len({len(row) for row in data}) == 1:
+        return int(max_joltages_batch(digit_rows(data), digits).sum())
+    return sum(find_max_joltages(data, digits))
+
+
+def part1(data: list[str]) -> int:
+    return total_joltage(data, 2)
+
+
+def part2(data: list[str]) -> int:
+    return total_joltage(data, 12)
+
+
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    data = parse_file(input_type)
+    return part1(data) if part == 1 else part2(data)
+
+
 def main():
     data = parse_file(InputType.INPUT)
 
     result1 = part1(data)
     print(f"Part 1: {result1}")
-    print(f"Part 1: {sum(find_max_joltages(data, 12))}")
+    print(f"Part 1: {sum(find_max_joltages(data, 2))}")
 
     result2 = part2(data)
     print(f"Part 2: {result2}")
@@ -1,21 +1,16 @@
-from aoc import parse_file, Point, InputType
-import paintbychar as pbc
+from aoc import (parse_file, Point, InputType, Grid, render, lazy_import,
+                 FrameSink, NO_FRAMES, Direction8, neighbor_counts)
+from typing import Iterator
+import numpy as np
+
+pbc = lazy_import('paintbychar')
+
 
 def printers_to_txt(printers: set[Point], marked: set[Point], size: int) -> str:
-    rows = []
-    for i in range(size):
-        row = []
-        for j in range(size):
-            if Point(i, j) in marked:
-                char = 'x'
-            elif Point(i, j) in printers:
-                char = '@'
-            else:
-                char = '.'
-            row.append(char)
-        rows.append(''.join(row))
-    string = '\n'.join(rows)
-    return string
+    # rows are indexed by x, the frames have always been drawn transposed
+    cells = dict.fromkeys(((p.y, p.x) for p in printers), '@')
+    cells.update(dict.fromkeys(((p.y, p.x) for p in marked), 'x'))
+    return render(cells, bounds=(0, 0, size - 1, size - 1))
 
 
 def printers_to_file(printers: set[Point], marked: set[Point], size: int, num: int) -> None:
@@ -27,20 +22,20 @@ def printers_to_file(printers: set[Point], marked: set[Point], size: int, num: i
     pbc.save_image(img, f'part2/printers{num:04}.png')
 
 
+def write_printers_frame(snapshot: tuple[frozenset[Point], frozenset[Point], int],
+                         num: int) -> None:
+    printers_to_file(*snapshot, num)
+
+
 def locate_printers(data: list[str]) -> set[Point]:
-    printers = set()
-    for y, line in enumerate(data):
-        for x, char in enumerate(line):
-            if char == "@":
-                printers.add(Point(x, y))
-    return printers
+    return Grid.from_lines(data).points('@')
 
 
 def part1(data: list[str]) -> int:
-    printers = locate_printers(data)
-    total = sum(len(p.all_neighbors.intersection(printers)) < 4 for p in
-                printers)
-    return total
+    grid = Grid.from_lines(data)
+    printers = grid.mask('@')
+    accessible = printers & (grid.count_neighbors('@') < 4)
+    return int(np.count_nonzero(accessible))
 
 
 def get_accessible_printers(printers: set[Point]) -> set[Point]:
@@ -51,23 +46,60 @@ def get_accessible_printers(printers: set[Point]) -> set[Point]:
     return accessible
 
 
-def part2(data: list[str]) -> int:
-    printers = locate_printers(data)
+def peel(mask: np.ndarray,
+         threshold: int = 4) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Repeatedly remove every set cell with fewer than `threshold` set
+    neighbours, yielding the (ys, xs) removed in each round.
+
+    Neighbour counts are computed once. Removing a cell decrements its
+    neighbours' counts and only those neighbours can be removed next
+    round, so as in a k-core decomposition each cell is handled a constant
+    number of times in total.
+    """
+    height, width = mask.shape
+    stride = width + 2
+    # a one cell border means neighbours of edge cells need no bounds checks
+    alive = np.pad(mask, 1).ravel()
+    counts = np.pad(neighbor_counts(mask).astype(np.int8), 1).ravel()
+    offsets = np.array([dy * stride + dx
+                        for dx, dy in (d.offset for d in Direction8)])
+    removing = np.flatnonzero(alive & (counts < threshold))
+    while len(removing):
+        alive[removing] = False
+        ys, xs = np.divmod(removing, stride)
+        yield ys - 1, xs - 1
+        neighbours = (removing[:, None] + offsets).ravel()
+        np.subtract.at(counts, neighbours, 1)
+        touched = np.unique(neighbours)
+        removing = touched[alive[touched] & (counts[touched] < threshold)]
+
+
+def part2(data: list[str], frames: FrameSink = NO_FRAMES) -> int:
+    """Frames go to write_printers_frame, e.g.
+    part2(data, FrameSink(write_printers_frame, every=2))."""
+    printers = Grid.from_lines(data).mask('@')
+    remaining = printers.copy()
     total = 0
-    accessible = get_accessible_printers(printers)
-    iteration = 0
-    printers_to_file(printers, set(), len(data), iteration)
-    while len(accessible) > 0:
-        accessible = get_accessible_printers(printers)
-        total += len(accessible)
-        iteration += 1
-        printers_to_file(printers, accessible, len(data), iteration)
-        printers.difference_update(accessible)
-        iteration += 1
-        printers_to_file(printers, set(), len(data), iteration)
+    if frames.wants():
+        frames.put((frozenset(Grid.select(remaining)), frozenset(), len(data)))
+    for ys, xs in peel(printers):
+        total += len(ys)
+        if frames.wants():
+            marked = frozenset(Point(x, y)
+                               for x, y in zip(xs.tolist(), ys.tolist()))
+            frames.put((frozenset(Grid.select(remaining)), marked, len(data)))
+        remaining[ys, xs] = False
+        if frames.wants():
+            frames.put((frozenset(Grid.select(remaining)), frozenset(),
+                        len(data)))
     return total
 
 
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    data = parse_file(input_type)
+    return part1(data) if part == 1 else part2(data)
+
+
 def main():
     data = parse_file(InputType.INPUT)
     result1 = part1(data)
@@ -1,28 +1,7 @@
-from aoc import parse_file, InputType
-from dataclasses import dataclass
+from aoc import (parse_file, InputType, Interval, IntervalCollection,
+                 IntervalIndex, TimeUnit, benchmark)
 
-
-@dataclass(frozen=True)
-class Interval:
-    start: int
-    end: int
-
-    def overlaps(self,
-                 other: 'Interval') -> bool:
-        return self.start <= other.end and self.end >= other.start
-
-
-    def is_in(self, value: int) -> bool:
-        return self.start <= value <= self.end
-
-
-    def combine_overlapping(self, other: 'Interval') -> 'Interval':
-        new_start = min(self.start, other.start)
-        new_end = max(self.end, other.end)
-        return Interval(new_start, new_end)
-
-    def calc_valid_count(self) -> int:
-        return self.end - self.start + 1
+import numpy as np
 
 
 def test_interval_overlaps():
@@ -37,63 +16,36 @@ def test_interval_overlaps():
     assert d.overlaps(c) is True
 
 
-@dataclass
-class IntervalCollection:
-    intervals: set[Interval]
-
-    @property
-    def count(self) -> int:
-        return len(self.intervals)
-
-    def add_interval(self, interval: Interval):
-        initial_intervals = self.intervals.copy()
-        overlaps = False
-        for existing in initial_intervals:
-            if existing.overlaps(interval):
-                overlaps = True
-                new = existing.combine_overlapping(interval)
-                self.intervals.remove(existing)
-                self.intervals.add(new)
-        if not overlaps:
-            self.intervals.add(interval)
-
-    def consolidate_intervals(self):
-        num_intervals = self.count
-        while True:
-            self._consolidate_intervals_once()
-            if self.count == num_intervals:
-                break
-            num_intervals = self.count
-
-    def _consolidate_intervals_once(self):
-        consolidated = IntervalCollection(set())
-        for interval in self.intervals:
-            consolidated.add_interval(interval)
-        self.intervals = consolidated.intervals
-
-
 def part1(database: set[Interval], id_list: set[int]) -> int:
-    fresh = set()
-    for id_value in id_list:
-        for interval in database:
-            if interval.is_in(id_value):
-                fresh.add(id_value)
-                break
-    return len(fresh)
+    ids = np.fromiter(id_list, dtype=np.int64, count=len(id_list))
+    return IntervalIndex(database).count_in(ids)
+
+
+def benchmark_index(n: int = 10 ** 7, intervals: int = 100_000):
+    """Bulk and sorted-stream membership of n random IDs against random
+    intervals, as in the input but much bigger."""
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, 10 ** 15, intervals)
+    lengths = rng.integers(0, 10 ** 9, intervals)
+    index = IntervalIndex(Interval(int(s), int(s + l))
+                          for s, l in zip(starts, lengths))
+    ids = rng.integers(0, 10 ** 15, n)
+    bulk = benchmark(index.count_in, ids, repeats=3, warmup=0)
+    print(f'{n} IDs against {len(index)} intervals')
+    print(f'searchsorted: {bulk.summary(TimeUnit.ms)}, '
+          f'{bulk.min_ns / n:.0f} ns per ID')
+    ordered = np.sort(ids).tolist()
+    stream = benchmark(lambda: sum(1 for _ in index.filter_sorted(ordered)),
+                       repeats=3, warmup=0)
+    print(f'merge join: {stream.summary(TimeUnit.ms)}, '
+          f'{stream.min_ns / n:.0f} ns per ID')
 
 
 def part2(database: set[Interval]) -> int:
-    interval_collection = IntervalCollection(database)
-    interval_collection.consolidate_intervals()
-    valid_num_ids = [interval.calc_valid_count() for
-                     interval in interval_collection.intervals]
-    return sum(valid_num_ids)
+    return IntervalCollection(database).calc_valid_count()
 
 
-def main():
-    test_interval_overlaps()
-    input_data = parse_file(InputType.INPUT)
-
+def parse_database(input_data: list[str]) -> tuple[set[Interval], set[int]]:
     database: set[Interval] = set()
     id_list: set[int] = set()
 
@@ -105,6 +57,17 @@ def main():
             database.add(interval)
         elif line.isdigit():
             id_list.add(int(line))
+    return database, id_list
+
+
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    database, id_list = parse_database(parse_file(input_type))
+    return part1(database, id_list) if part == 1 else part2(database)
+
+
+def main():
+    test_interval_overlaps()
+    database, id_list = parse_database(parse_file(InputType.INPUT))
 
     result_part1 = part1(database, id_list)
     print(f"Part 1: {result_part1}")
@@ -1,8 +1,11 @@
 from string import digits
 
-from aoc import parse_file, InputType
+from aoc import parse_file, InputType, Grid, product_tree
 from dataclasses import dataclass
 from enum import StrEnum
+from typing import Iterable, Iterator
+
+import numpy as np
 
 
 class Operation(StrEnum):
@@ -15,17 +18,15 @@ class Expression:
     numbers: list[int]
     operation: Operation
 
-    def evaluate(self) -> int:
+    def evaluate(self, workers: int = None) -> int:
+        """`workers` processes share very long products."""
         if not self.numbers:
             return 0
         match self.operation:
             case Operation.ADD:
                 return sum(self.numbers)
             case Operation.MULTIPLY:
-                result = 1
-                for n in self.numbers:
-                    result *= n
-                return result
+                return product_tree(self.numbers, workers)
             case _:
                 raise ValueError(f'Unknown operation: {self.operation}')
 
@@ -62,38 +63,137 @@ class Homework:
             expressions = self.get_cephalopod_expressions()
         else:
             expressions = self.get_expressions()
-        return sum(expr.evaluate() for expr in expressions)
+        return evaluate_all(expressions)
+
+
+def evaluate_all(expressions: Iterable[Expression],
+                 workers: int = None) -> int:
+    """Sum expressions as they arrive, keeping only the running total."""
+    total = 0
+    for expr in expressions:
+        total += expr.evaluate(workers)
+    return total
+
+
+SPACE = ord(' ')
+OPERATIONS = {ord(op): op for op in Operation}
+# longest operand Horner's rule can build in an int64
+INT64_DIGITS = 18
+
+
+@dataclass
+class Worksheet:
+    """The worksheet as a fixed-width byte grid: digit rows on top, the
+    operator row last. Problems are separated by all-blank columns."""
+    grid: Grid
+
+    @classmethod
+    def from_lines(cls, lines: list[str]) -> 'Worksheet':
+        return cls(Grid.from_lines(lines))
+
+    def problem_spans(self) -> tuple[np.ndarray, np.ndarray]:
+        """Start and stop columns of each problem."""
+        filled = (self.grid.cells != SPACE).any(axis=0)
+        edges = np.diff(filled.astype(np.int8), prepend=0, append=0)
+        return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+    def expressions(self, cephalopod: bool = False,
+                    batch: int = 4096) -> Iterator[Expression]:
+        """Decode the problems `batch` at a time, yielding them in order.
+
+        Normally each digit row of a problem holds one number. Cephalopods
+        write one number per column instead, most significant digit on
+        top. Numbers are read by Horner's rule straight from the byte grid;
+        the rare operand longer than INT64_DIGITS is read again from its
+        bytes as a Python int.
+        """
+        digit_rows, operators = self.grid.cells[:-1], self.grid.cells[-1]
+        starts, stops = self.problem_spans()
+        for first in range(0, len(starts), batch):
+            start, stop = starts[first:first + batch], stops[first:first + batch]
+            # each problem holds exactly one operator and '+' and '*' sort
+            # above ' ', so the maximum over the span picks it out
+            ops = np.maximum.reduceat(operators[start[0]:stop[-1]],
+                                      start - start[0])
+            if cephalopod:
+                yield from self._column_expressions(
+                    digit_rows[:, start[0]:stop[-1]], start - start[0],
+                    stop - start[0], ops)
+            else:
+                yield from self._row_expressions(digit_rows, start, stop, ops)
+
+    def evaluate(self, cephalopod: bool = False, workers: int = None) -> int:
+        return evaluate_all(self.expressions(cephalopod), workers)
+
+    @staticmethod
+    def _row_expressions(digit_rows: np.ndarray, start: np.ndarray,
+                         stop: np.ndarray,
+                         ops: np.ndarray) -> Iterator[Expression]:
+        width = int((stop - start).max())
+        values = np.zeros((len(digit_rows), len(start)), dtype=np.int64)
+        lengths = np.zeros(values.shape, dtype=np.int64)
+        for j in range(width):
+            inside = start + j < stop
+            column = digit_rows[:, np.minimum(start + j, stop - 1)]
+            is_digit = (column != SPACE) & inside
+            values = np.where(is_digit, values * 10 + column - ord('0'),
+                              values)
+            lengths += is_digit
+        present = lengths > 0
+        if (lengths > INT64_DIGITS).any():
+            values = values.astype(object)
+            for row, problem in zip(*np.nonzero(lengths > INT64_DIGITS)):
+                digits_ = digit_rows[row, start[problem]:stop[problem]]
+                values[row, problem] = int(bytes(digits_).replace(b' ', b''))
+        for numbers, found, op in zip(values.T.tolist(), present.T.tolist(),
+                                      ops.tolist()):
+            yield Expression(numbers=[n for n, f in zip(numbers, found) if f],
+                             operation=OPERATIONS[op])
+
+    @staticmethod
+    def _column_expressions(block: np.ndarray, start: np.ndarray,
+                            stop: np.ndarray,
+                            ops: np.ndarray) -> Iterator[Expression]:
+        values = np.zeros(block.shape[1], dtype=np.int64)
+        for row in block:
+            is_digit = row != SPACE
+            values = np.where(is_digit, values * 10 + row - ord('0'), values)
+        lengths = (block != SPACE).sum(axis=0)
+        present = (lengths > 0).tolist()
+        values = values.tolist()
+        for column in np.flatnonzero(lengths > INT64_DIGITS).tolist():
+            values[column] = int(bytes(block[:, column]).replace(b' ', b''))
+        for s, e, op in zip(start.tolist(), stop.tolist(), ops.tolist()):
+            yield Expression(numbers=[n for n, f in zip(values[s:e],
+                                                        present[s:e]) if f],
+                             operation=OPERATIONS[op])
+
+
+def test_long_operands():
+    wide = ['12345678901234567890123 5',
+            '1                       6',
+            '+                       *']
+    assert part1(wide) == 12345678901234567890154
+    tall = ['9 1'] * 20 + ['+ *']
+    assert part2(tall) == 99999999999999999999 + 11111111111111111111
+    print('test_long_operands passed')
 
 
 def part1(data: list[str]) -> int:
-    data = [row.split() for row in data]
-    hw = Homework(data)
-    return hw.evaluate()
-
-
-def part2(data: str) -> int:
-    for row in data:
-        print(row[0])
-    data = [row+'      ' for row in data]
-    data = [list(row[::-1]) for row in zip(*reversed(data))]
-    expressions = []
-    nums = []
-    for row in data:
-        new_op = row.pop(-1)
-        op = new_op if new_op in ('+', '*') else op
-        if set(row) == {' '}:
-            expressions.append(Expression(numbers=[int(n) for n in nums],
-                                          operation=Operation(op)))
-            nums = []
-        else:
-            nums.append(''.join(row).strip())
-    expressions.append(Expression(numbers=[int(n) for n in nums],
-                                  operation=Operation(op)))
+    return Worksheet.from_lines(data).evaluate()
+
 
-    return sum(expr.evaluate() for expr in expressions)
+def part2(data: list[str]) -> int:
+    return Worksheet.from_lines(data).evaluate(cephalopod=True)
+
+
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    data = parse_file(input_type)
+    return part1(data) if part == 1 else part2(data)
 
 
 def main(input_type: InputType) -> None:
+    test_long_operands()
     data = parse_file(input_type)
 
     #result1 = part1(data)
@@ -1,6 +1,12 @@
-from aoc import parse_file, Point, Direction, InputType
-from dataclasses import dataclass
-import paintbychar as pbc
+from aoc import (parse_file, Point, Direction, InputType, render, lazy_import,
+                 FrameSink, NO_FRAMES, Grid)
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Iterable, Iterator
+
+import numpy as np
+
+pbc = lazy_import('paintbychar')
 
 
 
@@ -11,13 +17,155 @@ class Node:
     children: set['Node'] = None
 
 
+SPLITTER, SPACE = ord('^'), ord('.')
+# a cell gets at most three contributions per row, so counts below this
+# cannot overflow int64 in the next OVERFLOW_CHECK rows
+OVERFLOW_CHECK = 8
+OVERFLOW_GUARD = 2 ** 63 // 3 ** OVERFLOW_CHECK
+
+
+def row_bitmasks(mask: np.ndarray) -> list[int]:
+    """Each row of a 2-D boolean mask as an int, bit x + 1 for column x."""
+    packed = np.packbits(np.pad(mask, ((0, 0), (1, 1))), axis=1,
+                         bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
 @dataclass
 class TachyonManifold:
+    grid: Grid
     start: Point
-    splitters: set[Point]
-    spaces: set[Point]
-    tree: Node = None
-    
+    tree: Node = field(default=None, repr=False)
+
+    @cached_property
+    def splitters(self) -> set[Point]:
+        return self.grid.points('^')
+
+    @cached_property
+    def spaces(self) -> set[Point]:
+        return self.grid.points('.')
+
+    @cached_property
+    def ymax(self) -> int:
+        return int(np.flatnonzero((self.grid.cells == SPACE).any(axis=1))[-1])
+
+    def row_timelines(self) -> Iterator[np.ndarray]:
+        """Yield the number of timelines at each cell of each row, from the
+        start row down to ymax, as build_tree counts them.
+
+        Rows are padded by a column on either side: a split next to the
+        edge sends a timeline off the grid, which only counts if it happens
+        on the last row. Only one row is held at a time, so memory is
+        O(width); counts switch to an object array of Python ints before
+        they can overflow int64.
+        """
+        counts = np.zeros(self.grid.width + 2, dtype=np.int64)
+        counts[self.start.x + 1] = 1
+        # counts outside [lo, hi) are zero; only that window is worked on
+        lo, hi = self.start.x + 1, self.start.x + 2
+        yield counts
+        for y in range(self.start.y + 1, self.ymax + 1):
+            # the padding columns are off the grid and go no further
+            lo, hi = max(lo, 1), min(hi, self.grid.width + 1)
+            above = counts[lo:hi]
+            counts = np.zeros_like(counts)
+            if lo < hi:
+                row = self.grid.cells[y, lo - 1:hi - 1]
+                split = np.where(row == SPLITTER, above, 0)
+                counts[lo:hi] = np.where(row == SPACE, above, 0)
+                counts[lo - 1:hi - 1] += split
+                counts[lo + 1:hi + 1] += split
+                lo, hi = lo - 1, hi + 1
+            if y % OVERFLOW_CHECK == 0 and lo < hi:
+                nonzero = np.flatnonzero(counts[lo:hi])
+                if len(nonzero):
+                    lo, hi = lo + nonzero[0], lo + nonzero[-1] + 1
+                else:
+                    lo = hi
+                if counts.dtype != object and counts.max() > OVERFLOW_GUARD:
+                    counts = counts.astype(object)
+            yield counts
+
+    def count_timelines(self) -> int:
+        if self.start.y > self.ymax:
+            return 0
+        for counts in self.row_timelines():
+            pass
+        return int(counts.sum())
+
+    @cached_property
+    def splitter_bits(self) -> list[int]:
+        return row_bitmasks(self.grid.cells == SPLITTER)
+
+    @cached_property
+    def space_bits(self) -> list[int]:
+        return row_bitmasks(self.grid.cells == SPACE)
+
+    @cached_property
+    def timeline_table(self) -> np.ndarray:
+        """Timelines that reach ymax from every cell, as table[y, x + 1].
+
+        Filled from the bottom row up: a timeline on the last row counts
+        once wherever it is, above that it takes the count of the cell
+        below or, if that is a splitter, of the cells either side of it.
+        Columns 0 and width + 1 are off the grid. The table is an object
+        array of Python ints if any count would overflow int64.
+        """
+        width = self.grid.width
+        below = np.ones(width + 2, dtype=np.int64)
+        rows = [below]
+        for y in range(self.ymax - 1, -1, -1):
+            row = self.grid.cells[y + 1]
+            counts = np.zeros_like(below)
+            counts[1:-1] = np.where(row == SPACE, below[1:-1], 0)
+            split = row == SPLITTER
+            counts[1:-1][split] = below[:-2][split] + below[2:][split]
+            if counts.dtype != object and counts.max() > OVERFLOW_GUARD:
+                counts = counts.astype(object)
+            rows.append(counts)
+            below = counts
+        dtype = object if rows[-1].dtype == object else np.int64
+        return np.array(rows[::-1], dtype=dtype)
+
+    def timelines_from(self, start: Point) -> int:
+        """part2's answer had the beam entered at start, in O(1) once
+        timeline_table is built."""
+        if start.y >= self.ymax:
+            return int(start.y == self.ymax)
+        if not 0 <= start.x < self.grid.width:
+            return 0
+        return int(self.timeline_table[start.y, start.x + 1])
+
+    def evolve_beam_bits(self,
+                         visited: bool = False) -> tuple[int, set[Point] | None]:
+        """evolve_beam with each row's beams held as the bits of one int.
+
+        Bit x + 1 is column x, leaving room for beams split off either edge.
+        The beams hitting splitters are beams & splitters, so a row costs a
+        few big-int operations however many beams there are. The visited
+        beam positions are only collected when asked for.
+        """
+        height = self.grid.height
+
+        def row(bits: list[int], y: int) -> int:
+            return bits[y] if y < height else 0
+
+        y = self.start.y + 1
+        beams = 1 << (self.start.x + 1)
+        seen = {y: beams} if visited else None
+        splits = 0
+        while beams & row(self.space_bits, y):
+            y += 1
+            hit = beams & row(self.splitter_bits, y)
+            splits += hit.bit_count()
+            beams = (beams & ~hit) | (hit << 1) | (hit >> 1)
+            if visited:
+                seen[y] = beams & row(self.space_bits, y)
+        if not visited:
+            return splits, None
+        return splits, {Point(x - 1, y) for y, bits in seen.items()
+                        for x in range(bits.bit_length()) if bits >> x & 1}
+
     def evolve_beam(self):
         split_counter = 0
         beams = {self.start.point_in_direction(Direction.S)}
@@ -38,11 +186,11 @@ class TachyonManifold:
             beams.update(new_beams.intersection(self.spaces))
         return split_counter, beams
     
-    def build_tree(self):
+    def build_tree(self, frames: FrameSink = NO_FRAMES):
         ymax = max(p.y for p in self.spaces)
         paths = {self.start: 1}
-        iteration = 0
-        save_state_as_image(paths, ymax, self, iteration)
+        if frames.wants():
+            frames.put((dict(paths), ymax, self))
         # process row by row (y increases monotonically), so parents are handled before children
         for y in range(self.start.y, ymax):
             row_points = [p for p in paths if p.y == y]
@@ -67,38 +215,183 @@ class TachyonManifold:
                         paths[downward] += count
                     else:
                         paths[downward] = count
-            iteration += 1
-            save_state_as_image(paths, ymax, self, iteration)
+            if frames.wants():
+                frames.put((dict(paths), ymax, self))
         return paths, ymax
     
     @classmethod
     def from_data(cls, data: list[str]) -> 'TachyonManifold':
-        splitters = set()
-        spaces = set()
-        start = None
-        for y, line in enumerate(data):
-            for x, char in enumerate(line):
-                point = Point(x, y)
-                match char:
-                    case 'S':
-                        start = point
-                    case '^':
-                        splitters.add(point)
-                    case '.':
-                        spaces.add(point)
-        return cls(start=start, splitters=splitters, spaces=spaces)
-        
+        grid = Grid.from_lines(data)
+        start, = grid.points('S')
+        return cls(grid=grid, start=start)
+
+
+# edge targets that are not splitters; as indices they pick the two slots
+# after the splitters' own in a counts array
+DEAD_END, LAST_ROW = -2, -1
+
+
+@dataclass
+class SplitterGraph:
+    """The splitters of a manifold as a DAG, for manifolds that are mostly
+    empty space.
+
+    A timeline falls straight down until the cell below it is not a space.
+    That cell is either a splitter, which sends it on from both sides, or
+    a dead end. So each splitter only needs to know where its left and
+    right outputs land: the next splitter down the neighbouring column,
+    LAST_ROW for reaching the last row, or DEAD_END. Timelines follow
+    build_tree's rules.
+
+    Cells are keyed x * (ymax + 1) + y, so the sorted keys of the stops
+    (the cells that aren't space) hold each column's stops together and
+    the stop below any cell is one searchsorted away. Splitters are
+    numbered in key order and the graph works on those numbers; Points
+    only come in and go out through the methods.
+    """
+    ymax: int
+    width: int
+    stops: np.ndarray = field(repr=False)
+    # per stop, its splitter number or DEAD_END
+    nodes: np.ndarray = field(repr=False)
+    # per splitter number, its key
+    splitters: np.ndarray = field(repr=False)
+    # per splitter number, the targets of its left and right outputs
+    edges: np.ndarray = field(repr=False)
+
+    @classmethod
+    def from_manifold(cls, tm: TachyonManifold) -> 'SplitterGraph':
+        cells = tm.grid.cells[:tm.ymax + 1]
+        # nonzero on the transpose goes column by column, in key order
+        xs, ys = np.nonzero(cells.T != SPACE)
+        stops = xs * (tm.ymax + 1) + ys
+        is_splitter = cells[ys, xs] == SPLITTER
+        nodes = np.where(is_splitter, np.cumsum(is_splitter) - 1, DEAD_END)
+        splitters = stops[is_splitter]
+        # every splitter has to be numbered before targets can be looked up
+        graph = cls(tm.ymax, tm.grid.width, stops, nodes, splitters,
+                    np.empty((len(splitters), 2), dtype=np.int64))
+        x, y = xs[is_splitter], ys[is_splitter]
+        graph.edges[:, 0] = graph._targets(x - 1, y)
+        graph.edges[:, 1] = graph._targets(x + 1, y)
+        return graph
+
+    def _targets(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Where timelines at the cells (x, y) end up: the splitters they
+        fall onto, LAST_ROW, or DEAD_END."""
+        height = self.ymax + 1
+        below = np.searchsorted(self.stops, x * height + y, side='right')
+        targets = np.full(len(below), LAST_ROW)
+        hit = np.flatnonzero(below < len(self.stops))
+        hit = hit[self.stops[below[hit]] // height == x[hit]]
+        targets[hit] = self.nodes[below[hit]]
+        targets[(x < 0) | (x >= self.width)] = DEAD_END
+        edge = y >= self.ymax
+        targets[edge] = np.where(y[edge] == self.ymax, LAST_ROW, DEAD_END)
+        return targets
+
+    def _target(self, point: Point) -> int:
+        return int(self._targets(np.array([point.x]), np.array([point.y]))[0])
+
+    def _points(self, nodes: np.ndarray) -> list[Point]:
+        xs, ys = np.divmod(self.splitters[nodes], self.ymax + 1)
+        return [Point(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+
+    def _nodes(self, points: Iterable[Point]) -> np.ndarray:
+        points = list(points)
+        keys = np.array([p.x * (self.ymax + 1) + p.y for p in points],
+                        dtype=np.int64)
+        index = np.searchsorted(self.stops, keys)
+        nodes = self.nodes[np.minimum(index, len(self.stops) - 1)]
+        found = (index < len(self.stops)) & (nodes >= 0)
+        found[found] = self.stops[index[found]] == keys[found]
+        if not found.all():
+            raise KeyError(points[np.flatnonzero(~found)[0]])
+        return nodes
+
+    def target(self, x: int, y: int) -> Point | int:
+        """Where a timeline at (x, y) ends up: the splitter it falls onto,
+        or how many timelines it is worth if it never reaches one."""
+        target = self._target(Point(x, y))
+        if target < 0:
+            return int(target == LAST_ROW)
+        return self._points(np.array([target]))[0]
+
+    def _timelines(self, nodes: np.ndarray) -> np.ndarray:
+        """Timelines from each of `nodes`, which must hold every splitter
+        they reach, by splitter number.
+
+        Outputs land on a lower row, so rows are done from the bottom up
+        with one gather each. The last two slots are DEAD_END's 0 and
+        LAST_ROW's 1. Counts switch to an object array of Python ints
+        before they can overflow int64.
+        """
+        counts = np.zeros(len(self.splitters) + 2, dtype=np.int64)
+        counts[LAST_ROW] = 1
+        ys = self.splitters[nodes] % (self.ymax + 1)
+        order = np.argsort(-ys, kind='stable')
+        nodes, ys = nodes[order], ys[order]
+        for row in np.split(nodes, np.flatnonzero(np.diff(ys)) + 1):
+            found = counts[self.edges[row]].sum(axis=1)
+            if (counts.dtype != object
+                    and found.max(initial=0) > OVERFLOW_GUARD):
+                counts = counts.astype(object)
+            counts[row] = found
+        return counts
+
+    def timelines(self, splitters: Iterable[Point] = None) -> dict[Point, int]:
+        """Timelines from each splitter (by default all of them); the
+        splitters they reach have to be among them."""
+        if splitters is None:
+            nodes = np.arange(len(self.splitters))
+        else:
+            nodes = self._nodes(splitters)
+        counts = self._timelines(nodes)
+        return dict(zip(self._points(nodes), counts[nodes].tolist()))
+
+    def count_timelines(self, start: Point) -> int:
+        root = self._target(start)
+        if root < 0:
+            return int(root == LAST_ROW)
+        return int(self._timelines(self._reachable(root))[root])
+
+    def _reachable(self, root: int) -> np.ndarray:
+        """The splitter numbers reachable from root, breadth first."""
+        seen = np.zeros(len(self.splitters), dtype=bool)
+        seen[root] = True
+        frontier = np.array([root])
+        while len(frontier):
+            frontier = np.unique(self.edges[frontier])
+            frontier = frontier[frontier >= 0]
+            frontier = frontier[~seen[frontier]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    def reachable(self, start: Point) -> set[Point]:
+        """The splitters a beam from start hits.
+
+        This is evolve_beam's split count on puzzle-shaped manifolds. That
+        engine also counts splitters below ymax and stops early on a row
+        where every beam sits on a splitter or off the grid.
+        """
+        root = self._target(start)
+        if root < 0:
+            return set()
+        return set(self._points(self._reachable(root)))
 
 
 def part1(data: list[str]) -> int:
     tm = TachyonManifold.from_data(data)
-    splits, _ = tm.evolve_beam()
+    splits, _ = tm.evolve_beam_bits()
     return splits
                 
 
-def part2(data: list[str]) -> int:
+def part2(data: list[str], frames: FrameSink = NO_FRAMES) -> int:
+    """Frames go to write_timeline_frame."""
     tm = TachyonManifold.from_data(data)
-    paths, ymax = tm.build_tree()
+    if not frames.enabled:
+        return tm.count_timelines()
+    paths, ymax = tm.build_tree(frames)
     return sum(v for k, v in paths.items() if k.y == ymax)
 
 
@@ -109,8 +402,13 @@ def save_state_as_image(paths, ymax, tm, iteration: int):
     pbc.save_image(img, f'part2/timeline_density{iteration:04d}.png')
 
 
+def write_timeline_frame(snapshot: tuple[dict, int, 'TachyonManifold'],
+                         iteration: int) -> None:
+    save_state_as_image(*snapshot, iteration)
+
+
 def redraw(paths: dict, ymax: int, tm: TachyonManifold) -> str:
-    data = [['.' for _ in range(ymax+1)] for __ in range(ymax+1)]
+    cells = {}
     max_value = 547847144422  # max(paths.values()), hardcoded for plotting
     for path, value in paths.items():
         match value:
@@ -136,15 +434,15 @@ def redraw(paths: dict, ymax: int, tm: TachyonManifold) -> str:
                 char = '9'
             case _:
                 raise ValueError
-        data[path.y][path.x] = char
-    for splitter in tm.splitters:
-        data[splitter.y][splitter.x] = '^'
-    data[tm.start.y][tm.start.x] = 'S'
-    rows = []
-    for row in data:
-        rows.append(''.join(row))
-    string = '\n'.join(rows)
-    return string
+        cells[path] = char
+    cells.update(dict.fromkeys(tm.splitters, '^'))
+    cells[tm.start] = 'S'
+    return render(cells, bounds=(0, 0, ymax, ymax))
+
+
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    data = parse_file(input_type)
+    return part1(data) if part == 1 else part2(data)
 
 
 def main():
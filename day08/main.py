@@ -1,6 +1,13 @@
-from aoc import parse_file, InputType, timer
+from aoc import parse_file, InputType, timer, DisjointSet
 from dataclasses import dataclass
-from copy import deepcopy
+import heapq
+import math
+from typing import Iterator
+
+import numpy as np
+
+# distance cells computed per block of rows in closest_pairs
+BLOCK_CELLS = 1 << 20
 
 
 @dataclass(frozen=True)
@@ -20,121 +27,127 @@ class Vector3D:
         return cls(int(nums[0]), int(nums[1]), int(nums[2]))
 
 
-def connect_closest_pairs(points: set[Vector3D], number: int):
-    pairs = find_closest_pairs(points)
-    connected_pairs = set()
-    connected_junctions = set()
-    for _, pair in zip(range(number), pairs):
-        #if len(pair[0].intersection(connected_junctions)) == 2:
-        #    continue
-        connected_pairs.add(pair[0])
-        connected_junctions.update(pair[0])
-    return connected_pairs
-
-
-def find_closest_pairs(points: set[Vector3D]) -> list[
-    tuple[frozenset[Vector3D], int]]:
-    pairs = find_distances_between_pairs(points)
-    pairs = [(k, v) for k, v in sorted(pairs.items(),
-                                       key=lambda item: item[1])]
-    return pairs
-
-
-def consolidate_circuits(circuits: list[set[Vector3D]]):
-    circuits_updating = True
-    old_circuits = deepcopy(circuits)
-    while circuits_updating:
-        for circuit1 in circuits:
-            for circuit2 in circuits:
-                if circuit1.intersection(circuit2):
-                    circuit1.update(circuit2)
-        if circuits == old_circuits:
-            circuits_updating = False
-        else:
-            old_circuits = deepcopy(circuits)
-
-
-def connect_until_mega_circuit(points):
-    pairs = find_closest_pairs(points)
-    circuits = []
-    biggest_circuit = set()
-    all_junctions = set()
-    for p in pairs:
-        all_junctions.update(p[0])
-    while len(biggest_circuit) != len(all_junctions):
-        pair, _ = pairs.pop(0)
-        pair_in_circuit = False
-        intersecting_circuits = []
-        for circuit in circuits:
-            if circuit.intersection(pair):
-                intersecting_circuits.append(circuit)
-                intersecting_circuits.append(pair)
-                pair_in_circuit = True
-        if intersecting_circuits:
-            for c in circuits:
-                for c2 in intersecting_circuits:
-                    if c.intersection(c2):
-                        c.update(c2)
-        if not pair_in_circuit:
-            circuits.append(set(pair))
-        circuits = [set(s) for s in {frozenset(d) for d in circuits}]
-        len_circuits = sorted(circuits, reverse=True, key=len)
-        biggest_circuit = set(len_circuits[0])
-    p1, p2 = pair
-    return p1.x * p2.x 
-
-
-def find_circuits(pairs: set[frozenset[Vector3D]]):
-    circuits = [set(p) for p in pairs]
-    old_circuits = deepcopy(circuits)
-    length_circuits = [len(c) for c in circuits]
-    circuits_updating = True
-    while circuits_updating:
-        for pair1 in pairs:
-            for circuit in circuits:
-                if circuit.intersection(pair1):
-                    circuit.update(pair1)
-        if circuits == old_circuits:
-            circuits_updating = False
-        else:
-            old_circuits = deepcopy(circuits)
-            
-    len_circuits = [len(c) for c in {frozenset(d) for d in circuits}]
-    len_circuits = sorted(len_circuits, reverse=True)
-    return len_circuits[0] * len_circuits[1] * len_circuits[2]
-
-
-def find_distances_between_pairs(points: set[Vector3D]) -> dict[frozenset[
-    Vector3D], int]:
-    pairs = {}
-    for point1 in points:
-        for point2 in points:
-            key = frozenset({point1, point2})
-            if len(key) == 2 and not key in pairs:
-                dist = point1.distance(point2)
-                pairs[key] = dist
-    return pairs
+def parse_points(data: list[str]) -> list[Vector3D]:
+    """The junctions in input order, without duplicates."""
+    return list(dict.fromkeys(Vector3D.from_str(row) for row in data))
+
+
+def as_array(points: list[Vector3D]) -> np.ndarray:
+    return np.array([(p.x, p.y, p.z) for p in points], dtype=np.int64)
+
+
+def closest_pairs(coords: np.ndarray, k: int,
+                  after: tuple[int, int, int] = None) -> tuple[
+        np.ndarray, np.ndarray, np.ndarray]:
+    """The k closest pairs of points as (distances, i, j) arrays, i < j,
+    ordered by squared distance, then i, then j.
+
+    Distances are computed a block of rows at a time against the points
+    from the block on, broadcasting one axis at a time, and the cells left
+    of the diagonal are masked out. Each block only passes on the pairs
+    that could still be in the k closest (found with argpartition), so
+    memory is O(n + k) however many pairs there are. With `after`, a
+    (d, i, j) from an earlier call, only the pairs that come after it are
+    considered.
+    """
+    n = len(coords)
+    best_d = best_i = best_j = np.empty(0, dtype=np.int64)
+    rows = max(1, BLOCK_CELLS // max(n, 1))
+    for top in range(0, n - 1, rows):
+        block, rest = coords[top:top + rows], coords[top:]
+        width = len(rest)
+        d = np.zeros((len(block), width), dtype=np.int64)
+        for axis in range(coords.shape[1]):
+            diff = block[:, axis, None] - rest[None, :, axis]
+            diff *= diff
+            d += diff
+        # cell [r, c] is the pair (top + r, top + c), only c > r is i < j
+        wanted = np.arange(width) > np.arange(len(block))[:, None]
+        if after is not None:
+            after_d, after_i, after_j = after
+            later = d > after_d
+            ties = d == after_d
+            if ties.any():
+                r, c = np.nonzero(ties)
+                i_, j_ = r + top, c + top
+                later[r, c] = (i_ > after_i) | ((i_ == after_i)
+                                                & (j_ > after_j))
+            wanted &= later
+        if len(best_d) == k:
+            # nothing further than the current k-th best can get in
+            wanted &= d <= best_d[-1]
+        cells = np.flatnonzero(wanted)
+        d = d.ravel()[cells]
+        i, j = cells // width, cells % width
+        if len(d) > k:
+            # keep ties with the k-th distance so (d, i, j) order is exact
+            keep = np.argpartition(d, k - 1)[:k]
+            keep = np.flatnonzero(d <= d[keep].max())
+            i, j, d = i[keep], j[keep], d[keep]
+        best_d = np.concatenate((best_d, d))
+        best_i = np.concatenate((best_i, i + top))
+        best_j = np.concatenate((best_j, j + top))
+        order = np.lexsort((best_j, best_i, best_d))[:k]
+        best_d, best_i, best_j = best_d[order], best_i[order], best_j[order]
+    return best_d, best_i, best_j
+
+
+def iter_closest_pairs(coords: np.ndarray,
+                       k: int = 1024) -> Iterator[tuple[int, int, int]]:
+    """Stream (distance, i, j) for every pair, closest first.
+
+    Each round finds the next k pairs after the last one streamed, with k
+    doubling every round; the (d, i, j) order is total, so no pair is
+    skipped or repeated.
+    """
+    after = None
+    while True:
+        d, i, j = closest_pairs(coords, k, after)
+        if not len(d):
+            return
+        yield from zip(d.tolist(), i.tolist(), j.tolist())
+        after = (int(d[-1]), int(i[-1]), int(j[-1]))
+        k *= 2
+
+
+def connect_circuits(points: list[Vector3D], number: int) -> DisjointSet:
+    """Join the number closest pairs, whether or not they already share a
+    circuit."""
+    circuits = DisjointSet(len(points))
+    _, first, second = closest_pairs(as_array(points), number)
+    for i, j in zip(first.tolist(), second.tolist()):
+        circuits.union(i, j)
+    return circuits
+
+
+def connect_until_mega_circuit(points: list[Vector3D]) -> int:
+    """Kruskal: join the closest pairs until one circuit is left, and
+    multiply the x of the pair that closed it."""
+    circuits = DisjointSet(len(points))
+    for _, i, j in iter_closest_pairs(as_array(points)):
+        if circuits.union(i, j) and circuits.count == 1:
+            return points[i].x * points[j].x
+    raise ValueError('need at least two junctions')
 
 
 def part1(data: list[str], n: int) -> int:
-    points = set()
-    for row in data:
-        point = Vector3D.from_str(row)
-        points.add(point)
-    pairs = connect_closest_pairs(points, n)
-    result = find_circuits(pairs)
-    return result
+    circuits = connect_circuits(parse_points(data), n)
+    return math.prod(heapq.nlargest(3, circuits.component_sizes()))
 
 
 def part2(data: list[str]) -> int:
-    points = set()
-    for row in data:
-        point = Vector3D.from_str(row)
-        points.add(point)
+    points = parse_points(data)
     result = connect_until_mega_circuit(points)
     return result
 
 
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    data = parse_file(input_type)
+    if part == 1:
+        return part1(data, 1000 if input_type == InputType.INPUT else 10)
+    return part2(data)
+
+
 @timer()
 def part1_for_timer():
     data = parse_file(InputType.INPUT)
@@ -1,13 +1,18 @@
-from aoc import parse_file, InputType, Vector, timer
-from shapely import Polygon
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+from aoc import (parse_file, InputType, Vector, timer, render, lazy_import,
+                 FrameSink, NO_FRAMES, benchmark, TimeUnit)
 import copy
+from dataclasses import dataclass
+
+import numpy as np
+
+shapely = lazy_import('shapely')
+figure = lazy_import('matplotlib.figure')
+patches = lazy_import('matplotlib.patches')
 
 
 @timer()
-def part1():
-    vectors = get_vectors()
+def part1(input_type: InputType = InputType.INPUT):
+    vectors = get_vectors(input_type)
     areas = {}
     for vector1 in vectors:
         for vector2 in vectors:
@@ -20,8 +25,8 @@ def part1():
     return sorted_areas[0]
 
 
-def get_vectors():
-    data = parse_file(InputType.INPUT)
+def get_vectors(input_type: InputType = InputType.INPUT):
+    data = parse_file(input_type)
     vectors = []
     for row in data:
         vals = row.split(',')
@@ -29,6 +34,119 @@ def get_vectors():
     return vectors
 
 
+@dataclass
+class CompressedFloor:
+    """The red and green tiles inside a loop of red tiles, on a grid
+    compressed to the loop's own coordinates.
+
+    Along each axis index 2k+1 is the coordinate xs[k] (or ys[k]) and the
+    even indices are the gaps between them and beyond the ends, weighted by
+    the tiles they stand for. `outside` is the 2-D prefix sum of the tiles
+    outside the loop, so any rectangle between red tiles is checked in
+    O(1).
+    """
+    xs: np.ndarray
+    ys: np.ndarray
+    outside: np.ndarray
+
+    @classmethod
+    def from_vectors(cls, vectors: list[Vector]) -> 'CompressedFloor':
+        corners = np.array([(v.x, v.y) for v in vectors], dtype=np.int64)
+        xs, cx = np.unique(corners[:, 0], return_inverse=True)
+        ys, cy = np.unique(corners[:, 1], return_inverse=True)
+        cx, cy = (2 * cx + 1).tolist(), (2 * cy + 1).tolist()
+        boundary = np.zeros((2 * len(ys) + 1, 2 * len(xs) + 1), dtype=bool)
+        for x0, y0, x1, y1 in zip(cx, cy, cx[1:] + cx[:1], cy[1:] + cy[:1]):
+            if x0 != x1 and y0 != y1:
+                raise ValueError(f'diagonal edge between corners '
+                                 f'{xs[x0 // 2]},{ys[y0 // 2]} and '
+                                 f'{xs[x1 // 2]},{ys[y1 // 2]}')
+            boundary[min(y0, y1):max(y0, y1) + 1,
+                     min(x0, x1):max(x0, x1) + 1] = True
+        # gap rows only cross vertical edges, so their parity is exact; off
+        # the boundary a coordinate row is the same as the gap row below it
+        inside = np.cumsum(boundary[::2], axis=1) % 2 == 1
+        filled = boundary.copy()
+        filled[::2] |= inside
+        filled[1::2] |= inside[1:]
+        outside = ~filled
+        outside &= cls._weights(ys)[:, None] > 0
+        outside &= cls._weights(xs) > 0
+        prefix = np.zeros((len(filled) + 1, filled.shape[1] + 1),
+                          dtype=np.int64)
+        prefix[1:, 1:] = outside.cumsum(axis=0).cumsum(axis=1)
+        return cls(xs, ys, prefix)
+
+    @staticmethod
+    def _weights(coordinates: np.ndarray) -> np.ndarray:
+        # empty gaps (between neighbouring tiles, or beyond the ends) stand
+        # for no tiles and can't make a rectangle leave the floor
+        weights = np.ones(2 * len(coordinates) + 1, dtype=np.int64)
+        weights[0] = weights[-1] = 0
+        weights[2:-1:2] = np.diff(coordinates) - 1
+        return weights
+
+    def indices(self, corners: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Compressed (x, y) indices of red tile coordinates."""
+        return (2 * np.searchsorted(self.xs, corners[..., 0]) + 1,
+                2 * np.searchsorted(self.ys, corners[..., 1]) + 1)
+
+    def outside_count(self, x0, y0, x1, y1):
+        """Cells outside the loop in the rectangles between compressed
+        cells, inclusive and in either order; works on arrays too."""
+        xlo, xhi = np.minimum(x0, x1), np.maximum(x0, x1) + 1
+        ylo, yhi = np.minimum(y0, y1), np.maximum(y0, y1) + 1
+        p = self.outside
+        return p[yhi, xhi] - p[ylo, xhi] - p[yhi, xlo] + p[ylo, xlo]
+
+    def contains(self, a: Vector, b: Vector) -> bool:
+        """Whether the rectangle between red tiles a and b is all red and
+        green."""
+        (x0, x1), (y0, y1) = self.indices(np.array([(a.x, a.y), (b.x, b.y)]))
+        return bool(self.outside_count(x0, y0, x1, y1) == 0)
+
+    def rectangle_areas(self, vectors: list[Vector]) -> tuple[
+            np.ndarray, np.ndarray, np.ndarray]:
+        """Areas of the rectangles between vectors i < j as (areas, i, j),
+        with 0 for the ones that leave the floor."""
+        corners = np.array([(v.x, v.y) for v in vectors], dtype=np.int64)
+        i, j = np.triu_indices(len(corners), 1)
+        cx, cy = self.indices(corners)
+        sides = np.abs(corners[i] - corners[j]) + 1
+        areas = sides[:, 0] * sides[:, 1]
+        areas[self.outside_count(cx[i], cy[i], cx[j], cy[j]) > 0] = 0
+        return areas, i, j
+
+
+def random_floor(n: int, size: int = 100_000, seed: int = 0) -> list[Vector]:
+    """The corners of a random histogram-shaped loop, n // 2 columns wide,
+    for benchmarks."""
+    rng = np.random.default_rng(seed)
+    columns = max(1, n // 2 - 1)
+    xs = np.sort(rng.choice(np.arange(1, size), columns + 1, replace=False))
+    heights = rng.integers(1, size, columns).tolist()
+    xs = xs.tolist()
+    vectors = [Vector(xs[0], 0)]
+    for x0, x1, height in zip(xs, xs[1:], heights):
+        vectors += [Vector(x0, height), Vector(x1, height)]
+    return vectors + [Vector(xs[-1], 0)]
+
+
+def benchmark_floor(n: int = 500):
+    """Building the compressed floor and checking every rectangle."""
+    vectors = random_floor(n)
+
+    def run():
+        areas, _, _ = CompressedFloor.from_vectors(vectors).rectangle_areas(
+            vectors)
+        return int(areas.max())
+
+    result = benchmark(run, repeats=5, warmup=1)
+    pairs = len(vectors) * (len(vectors) - 1) // 2
+    print(f'{len(vectors)} corners, {pairs} rectangles: '
+          f'{result.summary(TimeUnit.ms)}')
+
+
 def draw_line_to_point(vector: Vector, start: Vector = None) -> set[Vector]:
     if start is None:
         start = Vector(0, vector.y)
@@ -65,10 +183,12 @@ def get_green_vectors(vectors: list[Vector]):
     return green_vectors
 
 
-def plot_floor(polygon: Polygon, rectangle: list[tuple[int, int]] = None, area: int = 0, iteration: int = 0, best_area: int = 0):
+def plot_floor(polygon: 'shapely.Polygon', rectangle: list[tuple[int, int]] = None, area: int = 0, iteration: int = 0, best_area: int = 0):
     x, y = polygon.exterior.xy
     hfont = {'fontname':'Source Code Pro'}
-    fig, ax = plt.subplots()
+    # no pyplot, so frames can be drawn from a FrameSink's worker threads
+    fig = figure.Figure()
+    ax = fig.subplots()
     ax.plot(x, y, '.', mfc='red', mec='None', linestyle='-', color='green', ms=3)
     if rectangle is not None:
         rect = patches.Rectangle(rectangle[0], rectangle[1][0], rectangle[1][1], edgecolor='red', facecolor='red', alpha=0.5)
@@ -81,71 +201,58 @@ def plot_floor(polygon: Polygon, rectangle: list[tuple[int, int]] = None, area:
     ax.set_axis_off()
     fig.patch.set_facecolor('#0F0F23')
     fig.savefig(f'part2/rectangles{iteration:04d}.png', dpi=200)
-    plt.close('all')
+
+
+def write_floor_frame(snapshot: tuple, iteration: int) -> None:
+    polygon, rectangle, area, best_area = snapshot
+    plot_floor(polygon, rectangle, area, iteration, best_area)
 
 
 @timer()
-def part2():
-    vectors = get_vectors()
-    polygon = Polygon([(v.x, v.y) for v in vectors+[vectors[0]]])
-    plot_floor(polygon)
-    iteration = 1
-    green_vectors = get_green_vectors(vectors)
-    green_vectors.update(vectors)
-    #visualise(set(vectors), green_vectors)
-    areas = {}
-    for vector1 in vectors:
-        for vector2 in vectors:
-            if vector1 != vector2:
-                key = frozenset((vector1, vector2))
-                if key in areas:
-                    continue
-                areas[key] = vector1.rectangle_area(vector2)
-    filtered_areas = {}
+def part2(input_type: InputType = InputType.INPUT,
+          frames: FrameSink = NO_FRAMES):
+    """Frames go to write_floor_frame."""
+    vectors = get_vectors(input_type)
+    floor = CompressedFloor.from_vectors(vectors)
+    areas, first, second = floor.rectangle_areas(vectors)
+    if frames.enabled:
+        put_floor_frames(vectors, areas, first, second, frames)
+    return int(areas.max())
+
+
+def put_floor_frames(vectors: list[Vector], areas: np.ndarray,
+                     first: np.ndarray, second: np.ndarray,
+                     frames: FrameSink) -> None:
+    """The loop, then each rectangle that stays on the floor."""
+    polygon = shapely.Polygon([(v.x, v.y) for v in vectors+[vectors[0]]])
+    if frames.wants():
+        frames.put((polygon, None, 0, 0))
     best_area = 0
-    for key, area in areas.items():
-        v1, v2 = key
-        xmin, xmax = min(v1.x, v2.x), max(v1.x, v2.x)
-        ymin, ymax = min(v1.y, v2.y), max(v1.y, v2.y)
-        rectangle : Polygon = Polygon([(xmin, ymin), (xmax, ymin),
-                                       (xmax, ymax), (xmin, ymax),
-                                       (xmin, ymin)])
-        if rectangle.within(polygon):
-            best_area = max(area, best_area)
-            plot_floor(polygon,
-                       [(xmin, ymin), ((xmax-xmin), (ymax-ymin))],
-                       area, iteration, best_area)
-            iteration += 1
-            filtered_areas[key] = area
-
-
-    sorted_areas = sorted(filtered_areas.values(), reverse=True)
-    return sorted_areas[0]
+    for area, i, j in zip(areas.tolist(), first.tolist(), second.tolist()):
+        if not area:
+            continue
+        best_area = max(area, best_area)
+        if frames.wants():
+            v1, v2 = vectors[i], vectors[j]
+            xmin, ymin = min(v1.x, v2.x), min(v1.y, v2.y)
+            frames.put((polygon,
+                        [(xmin, ymin), (abs(v1.x - v2.x), abs(v1.y - v2.y))],
+                        area, best_area))
 
 
-def visualise(red_vectors: set[Vector], green_vectors: set[Vector]):
+def visualise(red_vectors: set[Vector], green_vectors: set[Vector],
+              max_size: tuple[int, int] = None):
     vectors = red_vectors.union(green_vectors)
-    xs = {v.x for v in vectors}
-    ys = {v.y for v in vectors}
-    ymin, ymax = min(xs), max(xs)
-    xmin, xmax = min(ys), max(ys)
-    rows = []
-    for j in range(0, xmax+1):
-        row = []
-        for i in range(0, ymax+1):
-            vector = Vector(i, j)
-            if vector in red_vectors:
-                char = '#'
-            elif vector in green_vectors:
-                char = 'X'
-            elif vector == Vector(xmin, ymin):
-                char = '.'
-            else:
-                char = '.'
-            row.append(char)
-        rows.append(''.join(row))
-    string = '\n'.join(rows)
-    print(string)
+    xmax = max(v.x for v in vectors)
+    ymax = max(v.y for v in vectors)
+    cells = dict.fromkeys(green_vectors, 'X')
+    cells.update(dict.fromkeys(red_vectors, '#'))
+    # the real floor is ~100k tiles wide, max_size downsamples it
+    print(render(cells, bounds=(0, 0, xmax, ymax), max_size=max_size))
+
+
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    return part1(input_type) if part == 1 else part2(input_type)
 
 
 def main():
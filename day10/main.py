@@ -1,10 +1,9 @@
-from aoc import parse_file, InputType, timer
+from aoc import parse_file, InputType, timer, lazy_import
 from dataclasses import dataclass
-from sympy import linsolve, Symbol
-from sympy.abc import symbols
 from itertools import product
-from pulp import (LpProblem, LpVariable, lpSum, LpMinimize, LpInteger,
-                  PULP_CBC_CMD)
+
+sympy = lazy_import('sympy')
+pulp = lazy_import('pulp')
 
 
 @dataclass(frozen=True)
@@ -96,18 +95,18 @@ class EquationSet:
     def get_optimal_presses(self) -> int:
         equations = []
         n_buttons = len(self.buttons)
-        x = symbols(f'x0:{n_buttons}', integer=True, nonnegative=True)
+        x = sympy.symbols(f'x0:{n_buttons}', integer=True, nonnegative=True)
         for j in range(len(self.target)):
             eq = sum(self.buttons[i][j] * x[i] for i in range(n_buttons)) - self.target[j]
             equations.append(eq)
 
         # Solve
-        solution = linsolve(equations, x)
+        solution = sympy.linsolve(equations, x)
         # linsolve returns a FiniteSet of tuples; extract the first solution
         sol = list(solution)[0]
 
         # If solution contains free parameters (symbols), we need to minimize total presses
-        free_symbols = [s for s in sol if isinstance(s, Symbol)]
+        free_symbols = [s for s in sol if isinstance(s, sympy.Symbol)]
         if free_symbols:
             target_max = max(self.target)
             min_total = None
@@ -132,14 +131,14 @@ class EquationSet:
     def minimal_presses(self):
         num_buttons = len(self.buttons)
         num_coords = len(self.target)
-        prob = LpProblem("MinimalPresses", LpMinimize)
-        x = [LpVariable(f"x{i}", lowBound=0, cat=LpInteger) for i in range(num_buttons)]
+        prob = pulp.LpProblem("MinimalPresses", pulp.LpMinimize)
+        x = [pulp.LpVariable(f"x{i}", lowBound=0, cat=pulp.LpInteger) for i in range(num_buttons)]
         # Objective
-        prob += lpSum(x)
+        prob += pulp.lpSum(x)
         # Constraints
         for j in range(num_coords):
-            prob += lpSum(self.buttons[i][j] * x[i] for i in range(num_buttons)) == self.target[j]
-        prob.solve(PULP_CBC_CMD(msg=0))
+            prob += pulp.lpSum(self.buttons[i][j] * x[i] for i in range(num_buttons)) == self.target[j]
+        prob.solve(pulp.PULP_CBC_CMD(msg=0))
         solution = [v.varValue for v in x]
         return sum(solution)
 
@@ -243,6 +242,11 @@ def part2(data: str) -> int:
     return sum(optimal_presses)
 
 
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    data = parse_file(input_type)
+    return part1(data) if part == 1 else part2(data)
+
+
 def main():
     data = parse_file(InputType.INPUT)
     result1 = part1(data)
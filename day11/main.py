@@ -57,8 +57,8 @@ class MemoGraph:
         return counter
 
 @timer(TimeUnit.us)
-def part1():
-    data = parse_file(InputType.INPUT)
+def part1(input_type: InputType = InputType.INPUT):
+    data = parse_file(input_type)
     graph = {}
     for row in data:
         nodes = row.split(' ')
@@ -68,8 +68,8 @@ def part1():
 
 
 @timer(TimeUnit.us)
-def part2():
-    data = parse_file(InputType.INPUT)
+def part2(input_type: InputType = InputType.INPUT):
+    data = parse_file(input_type)
     graph = {}
     for row in data:
         nodes = row.split(' ')
@@ -88,6 +88,10 @@ def part2():
     #paths2 = all_paths(graph, 'fft', 'dac', via=None)
     return paths_to_fft*middle_paths*paths_to_out #len(paths1), len(paths2)
 
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    return part1(input_type) if part == 1 else part2(input_type)
+
+
 def main():
     print(f'Part 1: {part1()}')
     print(f'Part 2: {part2()}')
@@ -1,10 +1,15 @@
 import copy
 import functools
-import paintbychar as pbc
-from aoc import parse_file, InputType, Direction, timer, TimeUnit
-from dataclasses import dataclass
-from PIL import Image, ImageDraw, ImageFont
+from aoc import (parse_file, InputType, Direction, timer, TimeUnit, render,
+                 lazy_import, FrameSink, NO_FRAMES)
+from dataclasses import dataclass, field
 import random
+import numpy as np
+
+pbc = lazy_import('paintbychar')
+Image = lazy_import('PIL.Image')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFont = lazy_import('PIL.ImageFont')
 
 
 EXAMPLES = (
@@ -115,7 +120,10 @@ class TreeSpace:
     present_requirements: tuple[int, ...]
     presents: tuple[Present, ...]
     placed_presents: set[Present] = None
-    image_counter: int = 0
+    frames: FrameSink = NO_FRAMES
+    _canvas: np.ndarray = field(default=None, init=False, repr=False)
+    _drawn: set[Present] = field(default=None, init=False, repr=False)
+    _drawn_for: set[Present] = field(default=None, init=False, repr=False)
 
     @classmethod
     def from_string(cls, s: str, presents: tuple[Present, ...]) -> "TreeSpace":
@@ -135,18 +143,35 @@ class TreeSpace:
             new.add(present.relative_coords)
         return frozenset(new)
 
+    def _draw(self, canvas: np.ndarray, present: Present, char: str) -> None:
+        for i, j in present.relative_coords:
+            if 0 <= i < self.size[1] and 0 <= j < self.size[0]:
+                canvas[i, j] = ord(char)
+
+    @property
+    def canvas(self) -> np.ndarray:
+        """Placed presents as a [row, column] array of character codes.
+
+        Only presents placed since the last call are drawn; the canvas is
+        reset whenever placed_presents is replaced by a new set.
+        """
+        if self._canvas is None or self._drawn_for is not self.placed_presents:
+            self._canvas = np.full((self.size[1], self.size[0]), ord('.'),
+                                   dtype=np.uint8)
+            self._drawn = set()
+            self._drawn_for = self.placed_presents
+        if self.placed_presents and len(self._drawn) != len(self.placed_presents):
+            for present in self.placed_presents - self._drawn:
+                self._draw(self._canvas, present, present.shape_char)
+                self._drawn.add(present)
+        return self._canvas
+
     def visualise(self, extra_shape: Present = None):
-        string = [['.' for _ in range(self.size[0])] for _ in range(self.size[1])]
-        for (i, j) in self.coords:
-            for p in self.placed_presents:
-                if (i, j) in p.relative_coords:
-                    string[i][j] = p.shape_char
-            if extra_shape is not None and (i,j) in extra_shape.relative_coords:
-                string[i][j] = '6'
-        rows = []
-        for row in string:
-            rows.append(''.join(row))
-        return '\n'.join(rows)
+        canvas = self.canvas
+        if extra_shape is not None:
+            canvas = canvas.copy()
+            self._draw(canvas, extra_shape, '6')
+        return render(canvas)
 
     def possible_to_fill_space(self) -> bool:
         min_area = sum(pr*p.area
@@ -326,65 +351,74 @@ class TreeSpace:
         title = f'Space Filled = {fraction:.3f}% - Placing Shape #{len(self.placed_presents):03d}/{sum(self.present_requirements)} Attempt #{iterations + 1:03d}'
         counter = f'{len(self.placed_presents):04d}-{iterations:04d}'
         self.save_treespace_image(counter, title, None)
-        print(f'Saved {counter}')
 
     def save_space_to_image(self, current, iterations):
+        if not self.frames.wants():
+            return
         fraction = float(
             sum([p.area for p in self.placed_presents])) * 100. / (
                                self.size[0] * self.size[1])
         title = f'Space Filled = {fraction:.3f}% - Placing Shape #{len(self.placed_presents) + 1:03d}/{sum(self.present_requirements)} Attempt #{iterations + 1:03d}'
-        counter = f'{len(self.placed_presents):04d}-{iterations:04d}'
-        self.save_treespace_image(counter, title, current)
-        print(f'Saved {counter}')
+        self.frames.put((self.size, self.visualise(current), title))
 
     def save_treespace_image(self, counter: str | int, title: str, poised_shape: Present = None) -> None:
-        img = pbc.string_to_image(self.visualise(poised_shape),
-                                  char_color_map={'0': (195, 15, 22),
-                                                  '1': (31, 39, 102),
-                                                  '2': (241, 217, 0),
-                                                  '3': (30, 121, 44),
-                                                  '4': 'white',
-                                                  '5': 'pink',
-                                                  '6': (0, 255, 255)},
-                                  fill_option=pbc.FillOption.BOTH,
-                                  bg_color='beige')
-        img_w, img_h = img.size
-        title_height = 80
-        padding = 20
-        # Create a new image with space for title
-        canvas_w = img_w + 2 * padding
-        canvas_h = img_h + title_height + 2 * padding
-        canvas = Image.new("RGB", (canvas_w, canvas_h), "white")
-        # Paste plot into canvas
-        plot_x = padding
-        plot_y = title_height + padding
-        canvas.paste(img, (plot_x, plot_y))
-        # Draw text
-        draw = ImageDraw.Draw(canvas)
-        font_title = ImageFont.truetype("SourceCodePro-VariableFont_wght.ttf", 36)
-        font_body = ImageFont.truetype("SourceCodePro-VariableFont_wght.ttf", 20)
-        # Title text
-        title_bbox = draw.textbbox((0, 0), title, font=font_title)
-        title_w = title_bbox[2] - title_bbox[0]
-        draw.text(
-            ((canvas_w - title_w) // 2, padding),
-            title,
-            fill="black",
-            font=font_title,
-        )
-        canvas.save(f'./visualisation/simplest_with_rotation/tree_{self.size}_{self.image_counter:04d}.png')
-        self.image_counter += 1
+        if self.frames.wants():
+            self.frames.put((self.size, self.visualise(poised_shape), title))
+
+
+def write_treespace_frame(snapshot: tuple[tuple[int, ...], str, str],
+                          frame: int) -> None:
+    size, text, title = snapshot
+    img = pbc.string_to_image(text,
+                              char_color_map={'0': (195, 15, 22),
+                                              '1': (31, 39, 102),
+                                              '2': (241, 217, 0),
+                                              '3': (30, 121, 44),
+                                              '4': 'white',
+                                              '5': 'pink',
+                                              '6': (0, 255, 255)},
+                              fill_option=pbc.FillOption.BOTH,
+                              bg_color='beige')
+    img_w, img_h = img.size
+    title_height = 80
+    padding = 20
+    # Create a new image with space for title
+    canvas_w = img_w + 2 * padding
+    canvas_h = img_h + title_height + 2 * padding
+    canvas = Image.new("RGB", (canvas_w, canvas_h), "white")
+    # Paste plot into canvas
+    plot_x = padding
+    plot_y = title_height + padding
+    canvas.paste(img, (plot_x, plot_y))
+    # Draw text
+    draw = ImageDraw.Draw(canvas)
+    font_title = ImageFont.truetype("SourceCodePro-VariableFont_wght.ttf", 36)
+    font_body = ImageFont.truetype("SourceCodePro-VariableFont_wght.ttf", 20)
+    # Title text
+    title_bbox = draw.textbbox((0, 0), title, font=font_title)
+    title_w = title_bbox[2] - title_bbox[0]
+    draw.text(
+        ((canvas_w - title_w) // 2, padding),
+        title,
+        fill="black",
+        font=font_title,
+    )
+    canvas.save(f'./visualisation/simplest_with_rotation/tree_{size}_{frame:04d}.png')
 
 
 @timer(TimeUnit.s)
-def part1():
-    data = parse_file(InputType.EXAMPLE3)
+def part1(input_type: InputType = InputType.EXAMPLE3,
+          frames: FrameSink = NO_FRAMES):
+    """Frames go to write_treespace_frame."""
+    data = parse_file(input_type)
     trees = []
     presents = tuple([Present.from_string(p, s) for s, p in zip('012345', INPUTS)])
     counter = 0
     for row in data:
         if 'x' in row:
-            trees.append(TreeSpace.from_string(row, presents))
+            tree = TreeSpace.from_string(row, presents)
+            tree.frames = frames
+            trees.append(tree)
     for i, tree in enumerate(trees):
         if tree.possible_to_fill_space():
             counter += 1
@@ -394,6 +428,12 @@ def part1():
     return counter
 
 
+def solve(part: int, input_type: InputType = InputType.INPUT) -> int:
+    if part != 1:
+        raise ValueError(f'Day 12 has no part {part}')
+    return part1(input_type)
+
+
 def main():
     print(f'Part 1: {part1()}')
 
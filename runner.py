@@ -0,0 +1,303 @@
+"""Run every day's solutions in parallel and report answers and timings.
+
+Each day/part runs in a fresh worker process with the day's directory as
+its working directory, so the relative paths used by `parse_file` resolve
+as they do when a day is run by hand.
+
+    python runner.py                      # all days, both parts
+    python runner.py --days 1 7 --parts 2 --input example
+    python runner.py --import-time --max-import-ms 200
+    python runner.py --timeout 60         # kill parts that run over a minute
+"""
+import argparse
+import importlib.util
+import io
+import multiprocessing
+import multiprocessing.connection
+import os
+import pathlib
+import re
+import resource
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from time import perf_counter_ns, process_time_ns
+
+from aoc import InputType, TimeUnit, format_time
+
+ROOT = pathlib.Path(__file__).resolve().parent
+
+
+@dataclass
+class PartResult:
+    day: int
+    part: int
+    answer: str | None
+    wall_ns: int
+    cpu_ns: int
+    peak_rss_kb: int
+    error: str | None = None
+    output: str = ''
+    timed_out: bool = False
+
+
+def discover_days(root: pathlib.Path = ROOT) -> dict[int, list[int]]:
+    """Map each dayNN package to the parts its main.py defines."""
+    days = {}
+    for path in sorted(root.glob('day[0-9][0-9]/main.py')):
+        source = path.read_text(encoding='utf-8')
+        parts = sorted({int(n) for n in
+                        re.findall(r'^def part(\d)\(', source, re.MULTILINE)})
+        days[int(path.parent.name[3:])] = parts
+    return days
+
+
+def load_day(day: int):
+    path = ROOT / f'day{day:02d}' / 'main.py'
+    spec = importlib.util.spec_from_file_location(f'day{day:02d}_main', path)
+    module = importlib.util.module_from_spec(spec)
+    # dataclasses resolve string annotations through sys.modules
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_part(day: int, part: int, input_type: InputType) -> PartResult:
+    """Solve one part inside a worker process."""
+    os.chdir(ROOT / f'day{day:02d}')
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    output = io.StringIO()
+    answer, error = None, None
+    wall_start, cpu_start = perf_counter_ns(), process_time_ns()
+    try:
+        with redirect_stdout(output):
+            answer = repr(load_day(day).solve(part, input_type))
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    wall_ns = perf_counter_ns() - wall_start
+    cpu_ns = process_time_ns() - cpu_start
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return PartResult(day, part, answer, wall_ns, cpu_ns, peak_rss_kb, error,
+                      output.getvalue())
+
+
+def _run_in_child(conn, day: int, part: int, input_type: InputType) -> None:
+    conn.send(run_part(day, part, input_type))
+    conn.close()
+
+
+def run_all(tasks: list[tuple[int, int]], input_type: InputType,
+            workers: int = None, timeout: float = None) -> list[PartResult]:
+    """Run each task in its own process, at most `workers` at a time.
+
+    A task still running after `timeout` seconds is killed and reported
+    as timed out, so one slow day cannot hold up the whole report.
+    """
+    # one fresh process per task keeps working directories, module state and
+    # peak RSS from leaking between days
+    context = multiprocessing.get_context('spawn')
+    workers = workers or os.cpu_count() or 1
+    pending = list(tasks)
+    running = {}
+    results = []
+    while pending or running:
+        while pending and len(running) < workers:
+            day, part = pending.pop(0)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_in_child,
+                                      args=(sender, day, part, input_type))
+            process.start()
+            sender.close()
+            running[receiver] = (process, day, part, perf_counter_ns())
+        wait = None
+        if timeout is not None:
+            oldest = min(started for *_, started in running.values())
+            wait = max(0., timeout - (perf_counter_ns() - oldest) / 1e9)
+        for receiver in multiprocessing.connection.wait(list(running), wait):
+            process, day, part, started = running.pop(receiver)
+            try:
+                result = receiver.recv()
+            except EOFError:
+                # the worker died before it could send a result back
+                process.join()
+                result = PartResult(day, part, None,
+                                    perf_counter_ns() - started, 0, 0,
+                                    f'worker exited with code '
+                                    f'{process.exitcode}')
+            receiver.close()
+            process.join()
+            results.append(result)
+        if timeout is None:
+            continue
+        for receiver, (process, day, part, started) in list(running.items()):
+            elapsed = perf_counter_ns() - started
+            if elapsed >= timeout * 1e9:
+                process.kill()
+                process.join()
+                receiver.close()
+                del running[receiver]
+                results.append(PartResult(day, part, None, elapsed, 0, 0,
+                                          f'after {timeout:g} s',
+                                          timed_out=True))
+    return sorted(results, key=lambda r: (r.day, r.part))
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportReport:
+    day: int
+    imports: list[ImportTime]
+    error: str | None = None
+
+    @property
+    def total_us(self) -> int:
+        return sum(i.cumulative_us for i in self.imports
+                   if i.depth == 0 and i.module == 'main')
+
+    def direct_imports(self) -> list[ImportTime]:
+        """The modules imported by the day's main.py, slowest first."""
+        # -X importtime lists a module after everything it imports, so the
+        # direct imports of main are the depth 1 entries just before it
+        children = []
+        for i in self.imports:
+            if i.depth == 1:
+                children.append(i)
+            elif i.depth == 0:
+                if i.module == 'main':
+                    break
+                children = []
+        return sorted(children, key=lambda i: i.cumulative_us, reverse=True)
+
+
+def parse_importtime(stderr: str) -> list[ImportTime]:
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(ImportTime(name.strip(), int(self_us),
+                                  int(cumulative_us), depth))
+    return imports
+
+
+def measure_imports(day: int) -> ImportReport:
+    """Import a day's main.py in a fresh interpreter under -X importtime."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=ROOT / f'day{day:02d}', env=env, capture_output=True, text=True)
+    error = None
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1]
+    return ImportReport(day, parse_importtime(completed.stderr), error)
+
+
+def import_reports(days: list[int], workers: int = None) -> list[ImportReport]:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(measure_imports, days))
+
+
+def format_imports(reports: list[ImportReport], unit: TimeUnit,
+                   top: int = 5) -> str:
+    lines = []
+    for report in reports:
+        if report.error is not None:
+            lines.append(f'{report.day:02d}  ERROR {report.error}')
+            continue
+        slowest = ', '.join(
+            f'{i.module} {format_time(i.cumulative_us * 1000, unit)}'
+            for i in report.direct_imports()[:top])
+        lines.append(f'{report.day:02d}  '
+                     f'{format_time(report.total_us * 1000, unit)}  '
+                     f'({slowest})')
+    return '\n'.join(lines)
+
+
+def format_table(results: list[PartResult], unit: TimeUnit) -> str:
+    header = ('Day', 'Part', 'Answer', 'Wall', 'CPU', 'Peak RSS')
+    rows = [header]
+    for r in results:
+        if r.timed_out:
+            answer = f'TIMEOUT {r.error}'
+        elif r.error is not None:
+            answer = f'ERROR {r.error}'
+        else:
+            answer = r.answer
+        rows.append((f'{r.day:02d}', str(r.part), answer,
+                     format_time(r.wall_ns, unit), format_time(r.cpu_ns, unit),
+                     f'{r.peak_rss_kb / 1024:.1f} MiB'))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    lines = ['  '.join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip()
+             for row in rows]
+    lines.insert(1, '  '.join('-' * w for w in widths))
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, nargs='+',
+                        help='days to run (default: all)')
+    parser.add_argument('--parts', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--input', default='input',
+                        choices=[t.name.lower() for t in InputType])
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=600,
+                        help='seconds a part may run before it is killed '
+                             '(default: 600, 0 for no limit)')
+    parser.add_argument('--unit', default='s',
+                        choices=[u.name for u in TimeUnit])
+    parser.add_argument('--verbose', action='store_true',
+                        help="show each part's captured output")
+    parser.add_argument('--import-time', action='store_true',
+                        help='report the import time of each day instead')
+    parser.add_argument('--max-import-ms', type=float, default=None,
+                        help='with --import-time, fail if any day takes '
+                             'longer than this to import')
+    args = parser.parse_args(argv)
+
+    available = discover_days()
+    days = args.days if args.days else list(available)
+    unit = TimeUnit[args.unit]
+
+    if args.import_time:
+        reports = import_reports(days, args.workers)
+        print(format_imports(reports, unit))
+        if args.max_import_ms is not None:
+            slow = [r.day for r in reports
+                    if r.error is None
+                    and r.total_us / 1000 > args.max_import_ms]
+            if slow:
+                sys.exit(f'Import time over {args.max_import_ms} ms: '
+                         f'days {slow}')
+        return
+    tasks = [(day, part) for day in days for part in args.parts
+             if part in available.get(day, [])]
+
+    start = perf_counter_ns()
+    results = run_all(tasks, InputType[args.input.upper()], args.workers,
+                      args.timeout or None)
+    elapsed = perf_counter_ns() - start
+
+    if args.verbose:
+        for r in results:
+            if r.output:
+                print(f'--- day {r.day:02d} part {r.part} ---')
+                print(r.output.rstrip('\n'))
+    print(format_table(results, unit))
+    print(f'\nTotal wall time: {format_time(elapsed, unit)}')
+
+
+if __name__ == '__main__':
+    main()